@@ -0,0 +1,360 @@
+# ann_index.py
+
+"""
+O arquivo ann_index.py implementa índices de busca aproximada de vizinhos mais próximos (ANN) para galerias grandes.
+O índice padrão é um IVF (inverted file): os encodings são agrupados por k-means e, na busca, apenas os grupos mais
+próximos da consulta (nprobe) são comparados. Se a biblioteca hnswlib estiver instalada, também é possível usar HNSW.
+Para galerias pequenas a busca exata da FaceGallery continua sendo usada, pois é mais rápida e sem perda de precisão.
+
+Cada vetor é indexado com um rótulo estável (ver gallery.stable_ids), que não depende da posição na matriz da galeria.
+O índice é persistido ao lado da galeria; quando ela muda, o índice salvo é carregado e apenas os vetores novos são
+inseridos (add) e os removidos são apagados (mark_deleted), sem reconstruir o grafo HNSW nem retreinar o IVF.
+"""
+
+import os                # Usado para verificar/substituir os arquivos do índice
+import numpy as np       # Biblioteca de álgebra linear usada no k-means e nas buscas
+from config import (     # Parâmetros do índice ANN (definidos no config.py)
+    ANN_INDEX, ANN_MIN_GALLERY_SIZE, ANN_NLIST, ANN_NPROBE, ANN_HNSW_EF, ANN_INDEX_FILE
+)
+
+try:
+    import hnswlib       # Biblioteca opcional com a implementação do HNSW
+except ImportError:
+    hnswlib = None
+
+# Quantidade máxima de linhas processadas por vez ao calcular distâncias (limita o uso de memória)
+CHUNK_SIZE = 8192
+
+
+def squared_distances(queries, points, point_norms=None):
+    """
+    Distâncias euclidianas ao quadrado (M, N) entre consultas e pontos, via uma multiplicação de matrizes.
+    """
+    if point_norms is None:
+        point_norms = np.einsum("ij,ij->i", points, points)
+    query_norms = np.einsum("ij,ij->i", queries, queries)
+    squared = query_norms[:, None] + point_norms[None, :] - 2.0 * (queries @ points.T)
+    return np.maximum(squared, 0.0, out=squared)
+
+
+def nearest_centroid(vectors, centroids):
+    """
+    Retorna o índice do centróide mais próximo de cada vetor, processando em blocos para não estourar a memória.
+    """
+    centroid_norms = np.einsum("ij,ij->i", centroids, centroids)
+    assign = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), CHUNK_SIZE):
+        chunk = vectors[start:start + CHUNK_SIZE]
+        assign[start:start + CHUNK_SIZE] = np.argmin(squared_distances(chunk, centroids, centroid_norms), axis=1)
+    return assign
+
+
+def kmeans(vectors, nlist, iterations=10, seed=0):
+    """
+    K-means simples (algoritmo de Lloyd) usado para treinar os centróides do IVF.
+    O treino usa no máximo 256 pontos por grupo, como é usual em índices IVF.
+    """
+    rng = np.random.default_rng(seed)
+    if len(vectors) > nlist * 256:
+        vectors = vectors[rng.choice(len(vectors), nlist * 256, replace=False)]
+
+    # Inicializa os centróides com pontos aleatórios da própria galeria
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assign = nearest_centroid(vectors, centroids)
+        counts = np.bincount(assign, minlength=nlist)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+
+        # Grupos vazios mantêm o centróide anterior
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+
+    return centroids
+
+
+class IVFIndex:
+    def __init__(self, centroids, nprobe=ANN_NPROBE):
+        # Centróides dos grupos (nlist, 128)
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+
+        # Quantos grupos são visitados por consulta: maior = mais recall, menor = menos latência
+        self.nprobe = nprobe
+
+        # Listas invertidas: para cada grupo, os rótulos estáveis e os vetores atribuídos
+        self.list_labels = [np.empty(0, dtype=np.int64) for _ in range(len(self.centroids))]
+        self.list_vectors = [np.empty((0, self.centroids.shape[1]), dtype=np.float32) for _ in range(len(self.centroids))]
+
+    @classmethod
+    def train(cls, matrix, labels, nlist=ANN_NLIST, nprobe=ANN_NPROBE):
+        """
+        Treina os centróides a partir da matriz da galeria e indexa todas as linhas.
+        Sem nlist configurado, usa aproximadamente 4·√N grupos.
+        """
+        if not nlist:
+            nlist = int(4 * np.sqrt(len(matrix)))
+        nlist = max(1, min(nlist, len(matrix)))
+
+        index = cls(kmeans(matrix, nlist), nprobe)
+        index.add(labels, matrix)
+        return index
+
+    def __len__(self):
+        # Quantidade de vetores indexados
+        return sum(len(labels) for labels in self.list_labels)
+
+    def labels(self):
+        """
+        Rótulos de todos os vetores indexados.
+        """
+        return np.concatenate(self.list_labels)
+
+    def undersized(self, size):
+        """
+        Indica se os centróides foram treinados para uma galeria muito menor (o IVF perde eficiência e é retreinado).
+        """
+        return not ANN_NLIST and len(self.centroids) < 2 * np.sqrt(size)
+
+    def add(self, labels, vectors):
+        """
+        Insere vetores, atribuindo cada um ao grupo do centróide mais próximo (sem retreinar o k-means).
+        """
+        labels = np.asarray(labels, dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(labels), -1)
+        if len(labels) == 0:
+            return
+
+        assign = nearest_centroid(vectors, self.centroids)
+        for group in np.unique(assign):
+            mask = assign == group
+            self.list_labels[group] = np.concatenate([self.list_labels[group], labels[mask]])
+            self.list_vectors[group] = np.concatenate([self.list_vectors[group], vectors[mask]])
+
+    def mark_deleted(self, labels):
+        """
+        Remove vetores do índice pelos rótulos.
+        """
+        if len(labels) == 0:
+            return
+        for group, group_labels in enumerate(self.list_labels):
+            keep = ~np.isin(group_labels, labels)
+            if not keep.all():
+                self.list_labels[group] = group_labels[keep]
+                self.list_vectors[group] = self.list_vectors[group][keep]
+
+    def search(self, queries, k=1):
+        """
+        Busca os k vizinhos mais próximos de cada consulta visitando apenas os nprobe grupos mais próximos.
+
+        Retorna (rótulos, distâncias) com formato (M, k), ou None para as consultas em que os grupos visitados
+        não tinham candidatos suficientes (nesse caso quem chamou deve usar a busca exata).
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        nprobe = min(self.nprobe, len(self.centroids))
+
+        # Seleciona os grupos mais próximos de cada consulta
+        probes = np.argpartition(squared_distances(queries, self.centroids), nprobe - 1, axis=1)[:, :nprobe]
+
+        labels = np.empty((len(queries), k), dtype=np.int64)
+        distances = np.empty((len(queries), k), dtype=np.float32)
+        for i, query in enumerate(queries):
+            candidates = np.concatenate([self.list_labels[g] for g in probes[i]])
+            if len(candidates) < k:
+                return None
+            vectors = np.concatenate([self.list_vectors[g] for g in probes[i]])
+
+            # Distância exata apenas contra os candidatos dos grupos visitados
+            dists = np.sqrt(squared_distances(query[None, :], vectors)[0])
+            top = np.argpartition(dists, k - 1)[:k] if k < len(dists) else np.arange(len(dists))
+            top = top[np.argsort(dists[top])]
+            labels[i] = candidates[top]
+            distances[i] = dists[top]
+
+        return labels, distances
+
+    def save(self, path):
+        """
+        Persiste os centróides e, para cada grupo, os rótulos e vetores atribuídos.
+        """
+        groups = np.concatenate([np.full(len(labels), g, dtype=np.int32) for g, labels in enumerate(self.list_labels)])
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                centroids=self.centroids,
+                labels=self.labels(),
+                vectors=np.concatenate(self.list_vectors),
+                groups=groups,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, dim, nprobe=ANN_NPROBE):
+        """
+        Carrega um índice salvo (centróides, rótulos e vetores de cada grupo).
+        """
+        with np.load(path, allow_pickle=False) as data:
+            index = cls(data["centroids"], nprobe)
+            labels = data["labels"]
+            vectors = data["vectors"]
+            groups = data["groups"]
+        if index.centroids.shape[1] != dim:
+            raise ValueError(f"dimensão {index.centroids.shape[1]} diferente de {dim}")
+        for g in range(len(index.centroids)):
+            index.list_labels[g] = labels[groups == g]
+            index.list_vectors[g] = vectors[groups == g]
+        return index
+
+
+class HNSWIndex:
+    def __init__(self, index, ef=ANN_HNSW_EF):
+        # Grafo HNSW da biblioteca hnswlib (espaço L2: as distâncias retornadas são ao quadrado), criado com
+        # allow_replace_deleted: as posições dos vetores apagados são reaproveitadas pelas inserções seguintes
+        self.index = index
+
+        # ef controla o compromisso entre recall e latência da busca
+        self.index.set_ef(ef)
+        self.ef = ef
+
+        # Rótulos dos vetores ativos no grafo e dos vetores apagados que ainda ocupam uma posição
+        self.live = set()
+        self.deleted = set()
+
+    @classmethod
+    def train(cls, matrix, labels, ef=ANN_HNSW_EF):
+        """
+        Constrói o grafo com todas as linhas da galeria.
+        """
+        graph = hnswlib.Index(space="l2", dim=matrix.shape[1])
+        graph.init_index(max_elements=max(len(matrix), 1), ef_construction=200, M=16, allow_replace_deleted=True)
+        index = cls(graph, ef)
+        index.add(labels, matrix)
+        return index
+
+    def __len__(self):
+        # Quantidade de vetores ativos no grafo
+        return len(self.live)
+
+    def labels(self):
+        """
+        Rótulos de todos os vetores ativos.
+        """
+        return np.fromiter(self.live, dtype=np.int64, count=len(self.live))
+
+    def undersized(self, size):
+        # O grafo cresce com as inserções: nunca precisa ser reconstruído por causa do tamanho
+        return False
+
+    def add(self, labels, vectors):
+        """
+        Insere vetores no grafo, ocupando primeiro as posições de vetores apagados e ampliando a capacidade se preciso.
+        Um rótulo apagado que volta à galeria tem o mesmo conteúdo (o rótulo é derivado do vetor): basta desmarcá-lo.
+        """
+        labels = [int(label) for label in labels]
+        restored = [i for i, label in enumerate(labels) if label in self.deleted]
+        for i in restored:
+            self.index.unmark_deleted(labels[i])
+            self.deleted.discard(labels[i])
+        self.live.update(labels[i] for i in restored)
+
+        new = np.setdiff1d(np.arange(len(labels)), restored)
+        if len(new) == 0:
+            return
+        needed = self.index.element_count + len(new)
+        if needed > self.index.get_max_elements():
+            self.index.resize_index(needed)
+        new_labels = [labels[i] for i in new]
+        self.index.add_items(np.asarray(vectors, dtype=np.float32)[new], np.asarray(new_labels), replace_deleted=True)
+        self.live.update(new_labels)
+
+        # As posições reaproveitadas deixam de pertencer aos rótulos apagados
+        self.deleted.intersection_update(self.index.get_ids_list())
+
+    def mark_deleted(self, labels):
+        """
+        Marca vetores como apagados: deixam de aparecer nas buscas e a posição é reaproveitada por add().
+        """
+        for label in labels:
+            self.index.mark_deleted(int(label))
+            self.live.discard(int(label))
+            self.deleted.add(int(label))
+
+    def search(self, queries, k=1):
+        """
+        Busca os k vizinhos aproximados de cada consulta, ou None se o grafo não encontrar k vizinhos
+        (nesse caso quem chamou deve usar a busca exata).
+        """
+        ef = max(self.ef, k)
+        self.index.set_ef(ef)
+        try:
+            labels, squared = self.index.knn_query(np.asarray(queries, dtype=np.float32), k=k)
+        except RuntimeError:
+            return None
+        return labels.astype(np.int64), np.sqrt(np.maximum(squared, 0.0))
+
+    def save(self, path):
+        """
+        Persiste o grafo e, ao lado, os rótulos dos vetores ativos.
+        """
+        self.index.save_index(path)
+        with open(path + ".labels.npy", "wb") as f:
+            np.save(f, self.labels())
+
+    @classmethod
+    def load(cls, path, dim, ef=ANN_HNSW_EF):
+        """
+        Carrega um grafo salvo e os rótulos dos vetores ativos.
+        """
+        graph = hnswlib.Index(space="l2", dim=dim)
+        graph.load_index(path, allow_replace_deleted=True)
+        index = cls(graph, ef)
+        index.live = set(np.load(path + ".labels.npy").tolist())
+        index.deleted = set(graph.get_ids_list()) - index.live
+        return index
+
+
+def create_index(matrix, labels, kind=ANN_INDEX, path=ANN_INDEX_FILE):
+    """
+    Cria (ou carrega do disco) o índice ANN configurado para a matriz da galeria, com um rótulo estável por linha.
+    Um índice salvo para uma versão anterior da galeria é atualizado de forma incremental: os vetores novos são
+    inseridos e os que saíram da galeria são apagados.
+
+    Retorna None quando o ANN está desativado ou a galeria é pequena demais (a busca exata é usada nesses casos).
+    """
+    if not kind or len(matrix) < ANN_MIN_GALLERY_SIZE:
+        return None
+
+    if kind == "hnsw" and hnswlib is None:
+        print("⚠️ hnswlib não está instalada; usando índice IVF.")
+        kind = "ivf"
+
+    index_class = HNSWIndex if kind == "hnsw" else IVFIndex
+    if path and kind == "hnsw":
+        path = os.path.splitext(path)[0] + ".hnsw"
+
+    labels = np.asarray(labels, dtype=np.int64)
+
+    # Tenta reaproveitar o índice persistido ao lado da galeria
+    if path and os.path.exists(path):
+        try:
+            index = index_class.load(path, matrix.shape[1])
+            if not index.undersized(len(matrix)):
+                indexed = index.labels()
+                removed = np.setdiff1d(indexed, labels)
+                added = ~np.isin(labels, indexed)
+                index.mark_deleted(removed)
+                index.add(labels[added], matrix[added])
+                print(f"🗂️ Índice {kind.upper()} carregado de '{path}' "
+                      f"({int(added.sum())} inseridos, {len(removed)} removidos).")
+                if len(removed) or added.any():
+                    index.save(path)
+                return index
+        except Exception as e:
+            print(f"⚠️ Índice '{path}' inválido, será reconstruído: {e}")
+
+    print(f"🛠️ Construindo índice {kind.upper()} para {len(matrix)} encodings...")
+    index = index_class.train(matrix, labels)
+    if path:
+        index.save(path)
+    return index
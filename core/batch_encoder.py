@@ -0,0 +1,51 @@
+# batch_encoder.py
+
+"""
+O arquivo batch_encoder.py extrai os encodings de vários rostos, de uma ou mais imagens, em uma única chamada ao
+encoder do dlib (compute_face_descriptor com listas de imagens), em vez de uma chamada por rosto como faz
+face_recognition.face_encodings. Isso amortiza o custo fixo de cada chamada quando há vários rostos em cena
+ou vários frames (de uma ou mais câmeras) chegando ao mesmo tempo.
+"""
+
+import dlib                          # Caixas e landmarks no formato exigido pela chamada em lote do encoder
+import numpy as np                   # Usado para montar a matriz de encodings de cada imagem
+import face_recognition              # Usado como alternativa quando o dlib não tem a chamada em lote
+from face_recognition import api     # Modelos do dlib já carregados pelo face_recognition (preditor de landmarks e encoder)
+
+# Quantidade de variações aleatórias de cada rosto no encoder (1 = sem variações, igual a face_recognition.face_encodings)
+NUM_JITTERS = 1
+
+
+def encode_faces(images, locations):
+    """
+    Extrai os encodings de todos os rostos de várias imagens em um único lote.
+
+    Parâmetros:
+    - images: imagens RGB (uint8), que podem ter tamanhos diferentes
+    - locations: para cada imagem, a lista de caixas (top, right, bottom, left) dos rostos a codificar
+
+    Retorna, para cada imagem, a lista de encodings na mesma ordem das caixas.
+    """
+    batch_images = []
+    batch_faces = []
+    for image, boxes in zip(images, locations):
+        if not boxes:
+            continue
+        # Landmarks de 5 pontos (o mesmo modelo de face_recognition.face_encodings), direto do preditor do dlib
+        faces = dlib.full_object_detections()
+        for top, right, bottom, left in boxes:
+            faces.append(api.pose_predictor_5_point(image, dlib.rectangle(left, top, right, bottom)))
+        batch_images.append(image)
+        batch_faces.append(faces)
+
+    if not batch_images:
+        return [[] for _ in images]
+
+    try:
+        descriptors = iter(api.face_encoder.compute_face_descriptor(batch_images, batch_faces, NUM_JITTERS))
+    except (TypeError, RuntimeError):
+        # Versões antigas do dlib sem a chamada em lote: uma chamada por imagem
+        return [face_recognition.face_encodings(image, boxes) if boxes else [] for image, boxes in zip(images, locations)]
+
+    return [[np.array(descriptor) for descriptor in next(descriptors)] if boxes else []
+            for boxes in locations]
@@ -0,0 +1,104 @@
+# buffer_pool.py
+
+"""
+O arquivo buffer_pool.py define a classe BufferPool, um conjunto de buffers de imagem (arrays NumPy) reutilizáveis.
+Em vez de alocar um novo array de ~900 KB a cada frame capturado (e novos arrays a cada redimensionamento e conversão
+de cor), a câmera e o módulo de reconhecimento pegam um buffer livre do pool e o devolvem quando o consumidor termina,
+o que reduz a fragmentação de memória e as pausas do coletor de lixo em dispositivos com pouca RAM.
+"""
+
+import threading         # Usado para proteger o pool, compartilhado entre as threads de captura e processamento
+import numpy as np       # Biblioteca usada para alocar os buffers
+
+
+class BufferPool:
+    def __init__(self, max_free=8, dtype=np.uint8):
+        # Quantidade máxima de buffers livres guardados no total (o excedente é liberado para o coletor de lixo).
+        # O limite vale para a soma de todos os formatos, pois os recortes de detecção variam de tamanho entre frames
+        self.max_free = max_free
+
+        # Tipo dos elementos dos buffers (imagens de 8 bits por canal)
+        self.dtype = dtype
+
+        # Buffers livres, separados por formato (altura, largura, canais), e a quantidade total deles
+        self.free = {}
+        self.free_count = 0
+
+        # Buffers em uso: id do array -> [contagem de referências, array]
+        self.in_use = {}
+
+        # Lock que protege as estruturas acima
+        self.lock = threading.Lock()
+
+        # Contadores para acompanhar a eficácia do pool
+        self.allocated = 0
+        self.reused = 0
+
+    def preallocate(self, shape, count):
+        """
+        Aloca antecipadamente buffers livres de um formato, para que a captura não precise alocar nada depois.
+        """
+        with self.lock:
+            free = self.free.setdefault(tuple(shape), [])
+            while len(free) < count and self.free_count < self.max_free:
+                free.append(np.empty(shape, dtype=self.dtype))
+                self.free_count += 1
+                self.allocated += 1
+
+    def acquire(self, shape):
+        """
+        Retorna um buffer do formato pedido, com uma referência em nome de quem chamou.
+        Um buffer novo só é alocado quando todos os do pool estão em uso.
+        """
+        shape = tuple(shape)
+        with self.lock:
+            free = self.free.get(shape)
+            if free:
+                buffer = free.pop()
+                self.free_count -= 1
+                self.reused += 1
+            else:
+                buffer = np.empty(shape, dtype=self.dtype)
+                self.allocated += 1
+            self.in_use[id(buffer)] = [1, buffer]
+        return buffer
+
+    def retain(self, buffer):
+        """
+        Acrescenta uma referência a um buffer em uso (ex: quando a câmera entrega o frame a um consumidor).
+        Arrays que não pertencem ao pool são ignorados.
+        """
+        with self.lock:
+            entry = self.in_use.get(id(buffer))
+            if entry is not None and entry[1] is buffer:
+                entry[0] += 1
+
+    def release(self, buffer):
+        """
+        Remove uma referência de um buffer; quando ninguém mais o usa, ele volta para a lista de livres.
+        Arrays que não pertencem ao pool são ignorados.
+        """
+        if buffer is None:
+            return
+        with self.lock:
+            entry = self.in_use.get(id(buffer))
+            if entry is None or entry[1] is not buffer:
+                return
+            entry[0] -= 1
+            if entry[0] > 0:
+                return
+            del self.in_use[id(buffer)]
+
+            # Pool cheio: abre espaço descartando um buffer de outro formato (formatos que deixaram de aparecer não
+            # ocupam memória para sempre); se todos forem do mesmo formato, o buffer devolvido é descartado
+            if self.free_count >= self.max_free:
+                other = next((shape for shape, buffers in self.free.items() if buffers and shape != buffer.shape), None)
+                if other is None:
+                    return
+                self.free[other].pop()
+                self.free_count -= 1
+                if not self.free[other]:
+                    del self.free[other]
+
+            self.free.setdefault(buffer.shape, []).append(buffer)
+            self.free_count += 1
@@ -6,12 +6,27 @@ o arquivo camera.py define uma classe Camera que faz a captura de vídeo em temp
 
 import cv2                # Importa a biblioteca OpenCV para captura de vídeo e processamento de imagem
 import threading          # Importa o módulo threading para executar captura em segundo plano (thread)
-from config import CAMERA_INDEX  # Importa o índice da câmera a ser utilizada a partir do arquivo config.py
+import time               # Usado para registrar o instante de captura de cada frame
+from config import (      # Parâmetros da câmera (definidos no config.py)
+    CAMERA_INDEX, CAMERA_RING_SIZE, CAMERA_TARGET_FPS, CAMERA_IDLE_FPS, CAMERA_RETRY_SECONDS, INACTIVITY_TIMEOUT_SECONDS
+)
+from buffer_pool import BufferPool  # Pool de buffers reutilizáveis para os frames capturados
+from motion import MotionDetector   # Detector de movimento que tira a câmera do modo ocioso
 
 class Camera:
-    def __init__(self):
-        # Inicializa o objeto de captura de vídeo com o índice da câmera especificado
-        self.video_capture = cv2.VideoCapture(CAMERA_INDEX)
+    def __init__(self, source=CAMERA_INDEX, name=None, frame_event=None):
+        """
+        Parâmetros:
+        - source: índice do dispositivo de vídeo ou URL do stream (RTSP/HTTP)
+        - name: nome da câmera no modo com várias câmeras (None = câmera única)
+        - frame_event: threading.Event sinalizado a cada novo frame (usado pelo escalonador de multi_camera.py)
+        """
+        # Nome da câmera (usado nas mensagens e, no modo com várias câmeras, nos tópicos MQTT)
+        self.name = name
+        self.frame_event = frame_event
+
+        # Inicializa o objeto de captura de vídeo com o índice ou a URL da câmera especificada
+        self.video_capture = cv2.VideoCapture(source)
 
         # Define a largura do frame de vídeo para 640 pixels
         self.video_capture.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
@@ -19,13 +34,44 @@ class Camera:
         # Define a altura do frame de vídeo para 480 pixels
         self.video_capture.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
 
+        # Mantém apenas o frame mais recente no driver, para que a captura mais lenta (FPS alvo/ocioso) não leia frames antigos
+        self.video_capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        if CAMERA_TARGET_FPS:
+            self.video_capture.set(cv2.CAP_PROP_FPS, CAMERA_TARGET_FPS)
+
         # Verifica se a câmera foi aberta corretamente
         if not self.video_capture.isOpened():
             # Lança uma exceção se não foi possível acessar a câmera
-            raise Exception("❌ Erro: Não foi possível abrir a câmera.")
+            raise Exception(f"❌ Erro: Não foi possível abrir a câmera{f' {name}' if name else ''} ({source}).")
+
+        # Buffer circular pré-alocado com os últimos frames: cada posição guarda (sequência, instante da captura, frame)
+        self.ring = [None] * CAMERA_RING_SIZE
+
+        # Número de sequência do frame mais recente (cresce monotonicamente; 0 = nenhum frame ainda)
+        self.seq = 0
+
+        # Condição sinalizada a cada novo frame, para que os consumidores esperem sem ficar em espera ativa
+        self.new_frame = threading.Condition()
+
+        # Pool de buffers onde os frames são capturados (read() escreve direto no buffer, sem alocar um novo array).
+        # Além das posições do buffer circular, sobram buffers para os frames em uso pelos consumidores.
+        self.pool = BufferPool(max_free=2 * CAMERA_RING_SIZE)
 
-        # Inicializa a variável que armazenará o frame mais recente
-        self.frame = None
+        # Formato dos frames da câmera, conhecido após a primeira captura
+        self.frame_shape = None
+
+        # Instante em que um rosto foi visto pela última vez (ver notify_activity()); sem rostos por
+        # INACTIVITY_TIMEOUT_SECONDS a captura entra no modo ocioso, com poucos frames por segundo
+        self.last_activity = time.time()
+        self.idle = False
+
+        # Detector de movimento usado para sair do modo ocioso (alimentado a cada frame, para o fundo estar sempre atualizado)
+        self.motion = MotionDetector()
+
+        # Evento de encerramento (só é acionado por release()) e evento que interrompe as esperas da thread de captura
+        # (no encerramento ou ao sair do modo ocioso)
+        self.stop_event = threading.Event()
+        self.wake_event = threading.Event()
 
         # Variável de controle para manter o loop de captura ativo
         self.running = True
@@ -40,26 +86,136 @@ class Camera:
         """
         Método executado pela thread que atualiza continuamente o frame mais recente.
         """
-        while self.running:
-            # Captura um frame da câmera
-            ret, frame = self.video_capture.read()
+        while self.running and not self.stop_event.is_set():
+            started = time.time()
+
+            # Pega um buffer livre do pool (antes da primeira captura o formato ainda é desconhecido)
+            buffer = self.pool.acquire(self.frame_shape) if self.frame_shape else None
+
+            # Captura um frame da câmera diretamente no buffer
+            ret, frame = self.video_capture.read(buffer) if buffer is not None else self.video_capture.read()
+            timestamp = time.time()
+
+            if not ret:
+                # Falha de leitura (câmera desconectada, fim do stream): espera antes de tentar de novo, sem ocupar a CPU
+                self.pool.release(buffer)
+                self.sleep(CAMERA_RETRY_SECONDS)
+                continue
+
+            # O OpenCV alocou um novo array (primeira captura ou resolução alterada): adota o novo formato
+            if frame is not buffer:
+                self.pool.release(buffer)
+                self.frame_shape = frame.shape
+                self.pool.preallocate(frame.shape, 2 * CAMERA_RING_SIZE)
+
+            # Publica o frame no buffer circular com um novo número de sequência
+            with self.new_frame:
+                self.seq += 1
+                slot = self.seq % len(self.ring)
+                evicted = self.ring[slot]
+                self.ring[slot] = (self.seq, timestamp, frame)
+                self.new_frame.notify_all()
+            if self.frame_event:
+                self.frame_event.set()
+
+            # O frame que saiu do buffer circular volta ao pool assim que nenhum consumidor o estiver usando
+            if evicted:
+                self.pool.release(evicted[2])
+
+            # Limita a taxa de captura: FPS alvo no modo normal, poucos FPS no modo ocioso
+            fps = self.update_idle(frame)
+            if fps:
+                self.sleep(max(0.0, 1.0 / fps - (time.time() - started)))
+
+        # Acorda os consumidores que estiverem esperando, para que percebam o encerramento
+        with self.new_frame:
+            self.new_frame.notify_all()
+
+    def sleep(self, seconds):
+        """
+        Espera até seconds segundos, retornando antes se a câmera for liberada ou sair do modo ocioso.
+        """
+        self.wake_event.wait(seconds)
+        self.wake_event.clear()
+
+    def update_idle(self, frame):
+        """
+        Atualiza o modo ocioso e retorna a taxa de captura desejada (None = a taxa nativa da câmera).
+        No modo ocioso, qualquer movimento na cena (ver motion.py) reativa a captura normal.
+        """
+        now = time.time()
+        moved = self.motion.update(frame) is not None
 
-            # Se a captura for bem-sucedida, atualiza o frame armazenado
-            if ret:
-                self.frame = frame
+        if moved and self.idle:
+            # Movimento detectado: volta à taxa normal e dá tempo para o reconhecimento encontrar um rosto
+            self.last_activity = now
+            self.idle = False
+            print(f"👀 Movimento detectado{self.label()}. Captura em taxa normal.")
+        elif not self.idle and now - self.last_activity > INACTIVITY_TIMEOUT_SECONDS:
+            self.idle = True
+            print(f"🌙 Nenhum rosto há {INACTIVITY_TIMEOUT_SECONDS}s{self.label()}. Captura em modo ocioso ({CAMERA_IDLE_FPS} FPS).")
+
+        return CAMERA_IDLE_FPS if self.idle else CAMERA_TARGET_FPS
+
+    def label(self):
+        """
+        Sufixo com o nome da câmera para as mensagens do console (vazio no modo com uma câmera).
+        """
+        return f" na câmera {self.name}" if self.name else ""
+
+    def notify_activity(self):
+        """
+        Informa à câmera que um rosto foi visto, mantendo (ou retomando) a captura na taxa normal.
+        """
+        self.last_activity = time.time()
+        if self.idle:
+            self.idle = False
+            self.wake_event.set()
+
+    def get_latest(self, after_seq=0, timeout=None):
+        """
+        Retorna o frame mais recente com número de sequência maior que after_seq, esperando até que ele exista.
+
+        Parâmetros:
+        - after_seq: sequência do último frame já processado pelo consumidor
+        - timeout: tempo máximo de espera em segundos (None = espera indefinidamente)
+
+        Retorna uma tupla (sequência, instante da captura, frame), ou None se o tempo esgotar ou a câmera for liberada.
+        A diferença entre sequências consecutivas recebidas, menos um, é a quantidade de frames que o consumidor pulou.
+
+        O buffer do frame fica reservado para o consumidor, que deve chamar release_frame(frame) ao terminar de usá-lo.
+        """
+        with self.new_frame:
+            if not self.new_frame.wait_for(lambda: self.seq > after_seq or not self.running, timeout):
+                return None
+            if self.seq <= after_seq:
+                return None
+            entry = self.ring[self.seq % len(self.ring)]
+            self.pool.retain(entry[2])
+            return entry
+
+    def release_frame(self, frame):
+        """
+        Devolve ao pool um frame obtido com get_latest(), para que o buffer seja reutilizado em uma próxima captura.
+        """
+        self.pool.release(frame)
 
     def get_frame(self):
         """
-        Retorna o frame mais recente capturado pela câmera.
+        Retorna o frame mais recente capturado pela câmera (ou None se ainda não houver nenhum).
+        O buffer não é reservado: ele pode ser reutilizado pela captura depois de sair do buffer circular.
         """
-        return self.frame
+        entry = self.ring[self.seq % len(self.ring)]
+        return entry[2] if entry else None
 
     def release(self):
         """
         Libera os recursos da câmera e finaliza a thread de captura com segurança.
         """
-        # Para o loop de captura
+        # Para o loop de captura e interrompe qualquer espera em andamento
         self.running = False
+        self.stop_event.set()
+        self.wake_event.set()
 
         # Aguarda o término da thread de captura
         self.thread.join()
@@ -68,4 +224,4 @@ class Camera:
         self.video_capture.release()
 
         # Mensagem de confirmação
-        print("✅ Câmera liberada.")
+        print(f"✅ Câmera{f' {self.name}' if self.name else ''} liberada.")
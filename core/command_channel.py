@@ -0,0 +1,181 @@
+# command_channel.py
+
+"""
+O arquivo command_channel.py define a classe CommandChannel, que recebe comandos pelo tópico MQTT_TOPIC_COMMAND
+para ajustar o reconhecimento em execução, sem editar o config.py nem reiniciar o programa.
+
+Formato dos comandos (JSON):
+- {"command": "set", "values": {"tolerance": 0.5, "confirmation_threshold": 3, "scale": 0.35, "latency_budget_ms": 80}}
+  Altera um ou mais parâmetros; "scale": "auto" volta ao ajuste automático da escala (ver latency_controller.py)
+- {"command": "reenroll"}: recarrega a galeria de rostos conhecidos (em segundo plano)
+- {"command": "open_door", "user": "Maria", "camera": "garagem"}: abre a porta manualmente ("camera" só com várias câmeras)
+
+As mensagens chegam pela thread de rede do paho, são validadas ali e entram em uma fila; o loop principal aplica os
+comandos pendentes entre dois frames (apply_pending), todos os valores de um "set" de uma vez, sem pausar a captura.
+O resultado de cada comando é publicado em MQTT_TOPIC_COMMAND_RESULT.
+"""
+
+import json                 # Leitura dos comandos e publicação dos resultados
+import queue                # Fila entre a thread de rede do paho e o loop principal
+import threading            # A recarga da galeria roda em uma thread separada
+from datetime import datetime  # Instante do comando da porta (enviado no payload)
+from mqtt_manager import camera_topic  # Tópico da porta de cada câmera
+from config import MQTT_TOPIC_COMMAND, MQTT_TOPIC_COMMAND_RESULT, MQTT_TOPIC_DOOR_CONTROL  # Tópicos usados
+
+
+def parse_number(value):
+    """
+    Aceita apenas números JSON (true/false e textos são recusados, em vez de convertidos para 1.0/0.0).
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"número esperado, recebido {value!r}")
+    return float(value)
+
+
+def parse_integer(value):
+    """
+    Aceita apenas números inteiros (2.7 é recusado, em vez de truncado para 2).
+    """
+    number = parse_number(value)
+    if not number.is_integer():
+        raise ValueError(f"número inteiro esperado, recebido {value!r}")
+    return int(number)
+
+
+def parse_scale(value):
+    """
+    Converte o valor de "scale": "auto" (ou null) volta ao ajuste automático; números são a escala fixa.
+    """
+    return None if value in (None, "auto") else parse_number(value)
+
+
+# Parâmetros aceitos pelo comando "set": nome -> (conversão do valor, validação do valor convertido)
+SETTINGS = {
+    "tolerance": (parse_number, lambda value: 0 < value < 1),
+    "confirmation_threshold": (parse_integer, lambda value: value >= 1),
+    "scale": (parse_scale, lambda value: value is None or 0 < value <= 1),
+    "latency_budget_ms": (parse_number, lambda value: value > 0),
+}
+
+
+class CommandChannel:
+    def __init__(self, mqtt, face_module, debouncers):
+        # Cliente MQTT, módulo de reconhecimento e controle de confirmação de cada câmera (alterados pelos comandos)
+        self.mqtt = mqtt
+        self.face_module = face_module
+        self.debouncers = debouncers
+
+        # Comandos já validados aguardando o próximo intervalo entre frames: (comando, dados)
+        self.pending = queue.Queue()
+
+        self.mqtt.subscribe(MQTT_TOPIC_COMMAND, self.on_message)
+        print(f"🛠️ Aguardando comandos em '{MQTT_TOPIC_COMMAND}'.")
+
+    def on_message(self, client, userdata, message):
+        """
+        Callback do paho (thread de rede): valida o comando e o coloca na fila. Nada é alterado aqui.
+        """
+        command = None
+        try:
+            request = json.loads(message.payload)
+            command = request["command"]
+            if command == "set":
+                data = self._validate(request["values"])
+            elif command == "open_door":
+                data = (str(request.get("user", "Comando remoto")), request.get("camera"))
+                if data[1] not in self.debouncers:
+                    raise ValueError(f"câmera desconhecida: {data[1]}")
+            elif command == "reenroll":
+                data = None
+            else:
+                raise ValueError(f"comando desconhecido: {command}")
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f"⚠️ Comando MQTT inválido: {e}")
+            self._reply(command, False, f"comando inválido: {e}")
+            return
+        self.pending.put((command, data))
+
+    @staticmethod
+    def _validate(values):
+        """
+        Converte e valida todos os valores de um comando "set" antes de aplicar qualquer um deles.
+        """
+        if not values:
+            raise ValueError("nenhum valor informado")
+        parsed = {}
+        for name, value in values.items():
+            if name not in SETTINGS:
+                raise ValueError(f"parâmetro desconhecido: {name}")
+            convert, valid = SETTINGS[name]
+            parsed[name] = convert(value)
+            if not valid(parsed[name]):
+                raise ValueError(f"valor inválido para {name}: {value}")
+        return parsed
+
+    def apply_pending(self):
+        """
+        Aplica os comandos recebidos desde o último frame. Chamado pelo loop principal entre dois frames;
+        não bloqueia (sem comandos pendentes, retorna imediatamente).
+        """
+        while True:
+            try:
+                command, data = self.pending.get_nowait()
+            except queue.Empty:
+                return
+
+            if command == "set":
+                self._apply_settings(data)
+                print(f"🛠️ Parâmetros alterados por comando: {data}")
+                self._reply(command, True, data)
+            elif command == "open_door":
+                self._open_door(*data)
+                self._reply(command, True, {"user": data[0], "camera": data[1]})
+            elif command == "reenroll":
+                threading.Thread(target=self._reenroll, name="reenroll", daemon=True).start()
+
+    def _apply_settings(self, values):
+        """
+        Aplica os parâmetros de um comando "set" (já validados).
+        """
+        if "tolerance" in values:
+            self.face_module.set_tolerance(values["tolerance"])
+        if "confirmation_threshold" in values:
+            for debouncer in self.debouncers.values():
+                debouncer.threshold = values["confirmation_threshold"]
+        if "scale" in values:
+            self.face_module.controller.set_scale(values["scale"])
+        if "latency_budget_ms" in values:
+            self.face_module.controller.budget = values["latency_budget_ms"] / 1000
+
+    def _open_door(self, user, camera):
+        """
+        Publica o comando de abertura da porta, no mesmo formato usado após um reconhecimento.
+        """
+        payload = json.dumps({"command": "open", "user": user, "timestamp": datetime.now().strftime('%Y%m%d_%H%M%S')})
+        self.mqtt.publish(camera_topic(MQTT_TOPIC_DOOR_CONTROL, camera), payload)
+        print(f"🟢 LED ON - Porta aberta por comando remoto ({user}){f' ({camera})' if camera else ''}")
+
+    def _reenroll(self):
+        """
+        Monta a galeria novamente a partir de KNOWN_FACES_DIR e a troca no módulo (thread separada).
+        Se outra recarga estiver em andamento (outro comando ou o observador da pasta), o comando é recusado.
+        """
+        try:
+            print("🔁 Recarga da galeria solicitada por comando...")
+            gallery = self.face_module.reload_gallery(blocking=False)
+        except Exception as e:
+            print(f"❌ Falha ao recarregar a galeria, mantendo a atual: {e}")
+            self._reply("reenroll", False, f"falha ao recarregar a galeria: {e}")
+            return
+        if gallery is None:
+            print("⚠️ Recarga da galeria já em andamento. Comando ignorado.")
+            self._reply("reenroll", False, "recarga já em andamento")
+            return
+        print(f"✅ Galeria recarregada: {len(gallery.names)} pessoas, {len(gallery)} amostras.")
+        self._reply("reenroll", True, {"pessoas": len(gallery.names), "amostras": len(gallery)})
+
+    def _reply(self, command, ok, detail):
+        """
+        Publica o resultado de um comando em MQTT_TOPIC_COMMAND_RESULT.
+        """
+        self.mqtt.publish(MQTT_TOPIC_COMMAND_RESULT, json.dumps({"command": command, "ok": ok, "detail": detail}))
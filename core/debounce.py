@@ -0,0 +1,79 @@
+# debounce.py
+
+"""
+O arquivo debounce.py define a classe FaceDebouncer, que implementa a lógica de confirmação (debounce) do main.py
+para vários rostos ao mesmo tempo: cada nome presente no frame tem o seu próprio contador de frames consecutivos
+e é confirmado ao atingir CONFIRMATION_THRESHOLD, independentemente das outras pessoas em cena.
+"""
+
+from config import CONFIRMATION_THRESHOLD  # Quantidade de frames consecutivos para confirmar uma identidade
+
+# Estado publicado quando não há nenhum rosto em cena
+NO_FACE = "Nenhum Rosto Detectado"
+
+
+class FaceDebouncer:
+    def __init__(self, threshold=CONFIRMATION_THRESHOLD):
+        # Frames consecutivos necessários para confirmar um nome
+        self.threshold = threshold
+
+        # Contador de frames consecutivos de cada nome ainda não confirmado
+        self.counts = {}
+
+        # Nomes já confirmados e ainda presentes em cena
+        self.confirmed = set()
+
+        # Indica se o estado "nenhum rosto" já foi publicado (evita publicações repetidas)
+        self.cleared = True
+
+    def update(self, names):
+        """
+        Atualiza o estado com os nomes reconhecidos no frame atual.
+
+        Parâmetros:
+        - names: nomes dos rostos do frame (pode conter "Desconhecido" e repetições)
+
+        Retorna a lista de eventos gerados neste frame:
+        - ("confirmed", nome): o nome atingiu o limiar de confirmação
+        - ("cleared", None): não há mais nenhum rosto em cena
+        """
+        names = set(names)
+
+        # Nenhum rosto: se antes havia alguém, publica ausência agora
+        if not names:
+            self.counts.clear()
+            self.confirmed.clear()
+            if self.cleared:
+                return []
+            self.cleared = True
+            return [("cleared", None)]
+
+        self.cleared = False
+        events = []
+
+        # Quem saiu de cena perde a confirmação e a contagem (será confirmado de novo se voltar)
+        self.confirmed &= names
+        self.counts = {name: count for name, count in self.counts.items() if name in names}
+
+        for name in sorted(names - self.confirmed):
+            # Mesmo nome detectado novamente (ou um novo nome, que inicia a contagem)
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+            # Se atingiu o limiar de confirmação, confirma o nome
+            if self.counts[name] >= self.threshold:
+                del self.counts[name]
+                self.confirmed.add(name)
+                events.append(("confirmed", name))
+
+        return events
+
+    def clear(self):
+        """
+        Força o estado "nenhum rosto" (usado no timeout de inatividade).
+        Retorna True se havia algum rosto confirmado ou em contagem.
+        """
+        was_active = not self.cleared
+        self.counts.clear()
+        self.confirmed.clear()
+        self.cleared = True
+        return was_active
@@ -0,0 +1,107 @@
+# discovery.py
+
+"""
+O arquivo discovery.py define o registro das entidades publicadas no Home Assistant via MQTT discovery
+(sensor do último rosto, status da porta e alerta de desconhecido, uma variante por câmera) e a classe
+DiscoveryRegistry, que monta e serializa os payloads uma única vez.
+Cada payload é identificado pelo hash do seu conteúdo: numa reconexão ao broker, apenas os payloads que mudaram
+são publicados novamente. A publicação completa só é repetida quando o Home Assistant reinicia e envia a mensagem
+de nascimento ("online" em MQTT_TOPIC_HA_STATUS), pois nesse caso ele precisa receber as configurações de novo.
+"""
+
+import hashlib                     # Hash do conteúdo de cada payload (detecta mudanças)
+import json                        # Serialização dos payloads de discovery
+from collections import namedtuple # Usado para descrever cada entidade do registro
+from config import (MQTT_TOPIC_STATE, MQTT_TOPIC_DISCOVERY, MQTT_TOPIC_DOOR_CONTROL, MQTT_TOPIC_DOOR_DISCOVERY,
+                    MQTT_TOPIC_ALERT, MQTT_TOPIC_ALERT_DISCOVERY)  # Tópicos de estado e de discovery de cada entidade
+
+# Descrição de uma entidade do Home Assistant: tópico de discovery, tópico de estado, id único (sem o sufixo da câmera),
+# nome, ícone, template do valor (None = valor bruto) e se o estado também é publicado como atributos JSON
+Entity = namedtuple("Entity", ["config_topic", "state_topic", "unique_id", "name", "icon", "value_template", "attributes"])
+
+# Registro das entidades publicadas para cada câmera
+ENTITIES = (
+    Entity(MQTT_TOPIC_DISCOVERY, MQTT_TOPIC_STATE, "face_recognition_cam_status",
+           "Último Rosto Reconhecido", "mdi:face-recognition", None, False),
+    Entity(MQTT_TOPIC_DOOR_DISCOVERY, MQTT_TOPIC_DOOR_CONTROL, "face_recognition_cam_door_command",
+           "Status da Porta", "mdi:door",
+           "{% if value_json.command == 'open' %}Aberta{% else %}Fechada{% endif %}", True),
+    Entity(MQTT_TOPIC_ALERT_DISCOVERY, MQTT_TOPIC_ALERT, "face_recognition_cam_unknown_alert",
+           "Alerta Rosto Desconhecido", "mdi:alert", "{{ value_json.message }}", True),
+)
+
+
+def camera_topic(topic, camera=None):
+    """
+    Retorna o tópico de uma câmera no modo com várias câmeras, inserindo o nome antes do último nível
+    (ex: "face_recognition/status" -> "face_recognition/garagem/status"). Sem câmera, o tópico não muda.
+    """
+    if camera is None:
+        return topic
+    prefix, _, leaf = topic.rpartition('/')
+    return f"{prefix}/{camera}/{leaf}"
+
+
+def discovery_topic(topic, camera=None):
+    """
+    Retorna o tópico de discovery do Home Assistant de uma câmera, acrescentando o nome ao id do nó
+    (ex: "homeassistant/sensor/facial_recognition_cam/status/config" -> ".../facial_recognition_cam_garagem/status/config").
+    """
+    if camera is None:
+        return topic
+    parts = topic.split('/')
+    parts[2] = f"{parts[2]}_{camera}"
+    return '/'.join(parts)
+
+
+def entity_config(entity, camera=None, device_info=False):
+    """
+    Monta o payload de discovery de uma entidade para uma câmera. A descrição completa do dispositivo
+    (nome, modelo, fabricante) só precisa aparecer em uma das entidades de cada dispositivo.
+    """
+    suffix = f"_{camera}" if camera else ""
+    state_topic = camera_topic(entity.state_topic, camera)
+    config = {"name": entity.name, "state_topic": state_topic, "unique_id": f"{entity.unique_id}{suffix}"}
+    if entity.value_template:
+        config["value_template"] = entity.value_template
+    config["icon"] = entity.icon
+    if entity.attributes:
+        config["json_attributes_topic"] = state_topic
+
+    # Um dispositivo do Home Assistant por câmera (ou o dispositivo original, com uma câmera)
+    config["device"] = {"identifiers": [f"facial_recognition_cam_01{suffix}"]}
+    if device_info:
+        config["device"].update({
+            "name": f"Câmera de Reconhecimento Facial{f' ({camera})' if camera else ''}",
+            "model": "PC Webcam",
+            "manufacturer": "DIY"
+        })
+    return config
+
+
+class DiscoveryRegistry:
+    def __init__(self, cameras=None, entities=ENTITIES):
+        # Payloads já serializados (tópico de discovery -> JSON) e o hash de cada um, montados uma única vez
+        self.messages = {}
+        for camera in cameras or [None]:
+            for i, entity in enumerate(entities):
+                config = entity_config(entity, camera, device_info=(i == 0))
+                self.messages[discovery_topic(entity.config_topic, camera)] = json.dumps(config)
+        self.hashes = {topic: hashlib.sha1(payload.encode()).hexdigest() for topic, payload in self.messages.items()}
+
+        # Hash do último payload confirmado pelo broker em cada tópico
+        self.published = {}
+
+    def pending(self, force=False):
+        """
+        Retorna os pares (tópico, payload) que ainda não foram publicados com o conteúdo atual
+        (todos, com force=True, ex: após a mensagem de nascimento do Home Assistant).
+        """
+        return [(topic, payload) for topic, payload in self.messages.items()
+                if force or self.published.get(topic) != self.hashes[topic]]
+
+    def mark_published(self, topic):
+        """
+        Registra que o payload atual do tópico foi confirmado pelo broker.
+        """
+        self.published[topic] = self.hashes[topic]
@@ -0,0 +1,160 @@
+# encoding_cache.py
+
+"""
+O arquivo encoding_cache.py define a classe EncodingCache, um cache persistente (arquivo .npz) dos encodings dos rostos conhecidos.
+Cada imagem é identificada pelo caminho, tamanho, data de modificação (mtime) e hash do conteúdo, de forma que na inicialização
+apenas as imagens novas ou alteradas precisam passar novamente pela detecção HOG e pelo encoder de 128 dimensões do dlib.
+"""
+
+import hashlib           # Usado para calcular o hash (SHA-1) do conteúdo das imagens
+import os                # Usado para obter tamanho/mtime dos arquivos e substituir o cache de forma atômica
+import numpy as np       # Usado para armazenar os encodings em formato binário compacto (.npz)
+from config import ENCODING_CACHE_FILE  # Caminho do arquivo de cache (definido no config.py)
+from gallery import ENCODING_SIZE       # Dimensão do vetor de características gerado pelo encoder do dlib
+
+
+def file_digest(path):
+    """
+    Calcula o hash SHA-1 do conteúdo de um arquivo, lendo em blocos para não carregar a imagem inteira na memória.
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class EncodingCache:
+    def __init__(self, path=ENCODING_CACHE_FILE):
+        # Caminho do arquivo .npz onde o cache é persistido
+        self.path = path
+
+        # Entradas do cache: caminho da imagem -> (tamanho, mtime em ns, hash, encoding ou None se não havia rosto)
+        self.entries = {}
+
+        # Índice secundário: hash do conteúdo -> caminho (permite reaproveitar encodings de arquivos renomeados/movidos)
+        self.by_hash = {}
+
+        # Indica se o cache foi alterado e precisa ser salvo
+        self.dirty = False
+
+        # Carrega o cache existente do disco (se houver)
+        self.load()
+
+    def load(self):
+        """
+        Carrega as entradas do arquivo .npz. Um cache ausente ou corrompido é simplesmente ignorado
+        (as imagens serão recodificadas e o cache será recriado no próximo save()).
+        """
+        if not self.path or not os.path.exists(self.path):
+            return
+
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                paths = data["paths"]
+                sizes = data["sizes"]
+                mtimes = data["mtimes"]
+                hashes = data["hashes"]
+                has_face = data["has_face"]
+                encodings = data["encodings"]
+        except Exception as e:
+            print(f"⚠️ Cache de encodings '{self.path}' inválido, será recriado: {e}")
+            return
+
+        for i, path in enumerate(paths):
+            # Imagens sem rosto também ficam no cache para não repetir a detecção a cada inicialização
+            encoding = encodings[i].copy() if has_face[i] else None
+            self.entries[str(path)] = (int(sizes[i]), int(mtimes[i]), str(hashes[i]), encoding)
+            self.by_hash[str(hashes[i])] = str(path)
+
+        print(f"🗃️ Cache de encodings carregado: {len(self.entries)} imagens.")
+
+    def lookup(self, path):
+        """
+        Procura o encoding de uma imagem no cache.
+
+        Retorna uma tupla (encontrado, encoding):
+        - encontrado: True se a imagem já foi processada e não mudou desde então
+        - encoding: vetor de 128 dimensões, ou None se a imagem não continha rosto
+        Uma imagem removida durante a consulta é tratada como ausente do cache.
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return False, None
+        entry = self.entries.get(path)
+
+        # Caminho rápido: mesmo tamanho e mesmo mtime, não é necessário ler o arquivo
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return True, entry[3]
+
+        # Caso contrário, compara pelo conteúdo (arquivo "tocado", copiado ou movido de lugar)
+        try:
+            digest = file_digest(path)
+        except FileNotFoundError:
+            return False, None
+        source = self.by_hash.get(digest)
+        if source is None or source not in self.entries:
+            return False, None
+
+        # Conteúdo idêntico a uma entrada já conhecida: reaproveita o encoding com a nova chave
+        encoding = self.entries[source][3]
+        self.entries[path] = (stat.st_size, stat.st_mtime_ns, digest, encoding)
+        self.by_hash[digest] = path
+        self.dirty = True
+        return True, encoding
+
+    def store(self, path, encoding, key):
+        """
+        Armazena o encoding calculado para uma imagem (ou None, se nenhum rosto foi detectado).
+        key é a tupla (tamanho, mtime em ns, hash) lida antes da decodificação (ver enrollment.encode_image):
+        o arquivo não é consultado de novo, pois pode ter sido trocado ou removido depois do encoding.
+        """
+        size, mtime_ns, digest = key
+        self.entries[path] = (size, mtime_ns, digest, encoding)
+        self.by_hash[digest] = path
+        self.dirty = True
+
+    def prune(self, valid_paths):
+        """
+        Remove do cache as imagens que não existem mais na galeria.
+        """
+        valid_paths = set(valid_paths)
+        for path in list(self.entries):
+            if path not in valid_paths:
+                digest = self.entries.pop(path)[2]
+                if self.by_hash.get(digest) == path:
+                    del self.by_hash[digest]
+                self.dirty = True
+
+    def save(self):
+        """
+        Persiste o cache no disco caso tenha sido alterado.
+        A escrita é feita em um arquivo temporário e depois substituída de forma atômica,
+        para que uma queda de energia no meio da gravação não corrompa o cache.
+        """
+        if not self.path or not self.dirty:
+            return
+
+        paths = list(self.entries)
+        encodings = np.zeros((len(paths), ENCODING_SIZE), dtype=np.float64)
+        has_face = np.zeros(len(paths), dtype=bool)
+        for i, path in enumerate(paths):
+            encoding = self.entries[path][3]
+            if encoding is not None:
+                encodings[i] = encoding
+                has_face[i] = True
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                paths=np.array(paths, dtype=str),
+                sizes=np.array([self.entries[p][0] for p in paths], dtype=np.int64),
+                mtimes=np.array([self.entries[p][1] for p in paths], dtype=np.int64),
+                hashes=np.array([self.entries[p][2] for p in paths], dtype=str),
+                has_face=has_face,
+                encodings=encodings,
+            )
+        os.replace(tmp_path, self.path)
+        self.dirty = False
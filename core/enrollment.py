@@ -0,0 +1,79 @@
+# enrollment.py
+
+"""
+O arquivo enrollment.py faz a extração dos encodings das imagens da galeria (cadastro dos rostos conhecidos).
+Quando há várias imagens a processar, elas são distribuídas entre vários processos (ProcessPoolExecutor),
+aproveitando todos os núcleos da CPU: cada processo decodifica a imagem, roda a detecção HOG e o encoder do dlib.
+Erros em arquivos individuais são coletados e reportados, sem interromper o cadastro das demais imagens.
+"""
+
+import hashlib                                       # Hash do conteúdo da imagem (chave do cache de encodings)
+import io                                            # A imagem é decodificada a partir dos bytes já lidos
+import multiprocessing                               # Usado para escolher o modo de criação dos processos
+import os                                            # Usado para descobrir a quantidade de núcleos disponíveis
+from concurrent.futures import ProcessPoolExecutor  # Pool de processos que executa as codificações em paralelo
+import face_recognition                              # Biblioteca usada para carregar as imagens e extrair os encodings
+from config import ENROLLMENT_WORKERS, ENROLLMENT_CHUNK_SIZE  # Parâmetros do cadastro paralelo (definidos no config.py)
+
+
+def encode_image(path):
+    """
+    Extrai o encoding do rosto presente em uma imagem. Executado dentro dos processos do pool.
+
+    Retorna uma tupla (caminho, encoding ou None se não há rosto, mensagem de erro ou None, chave do cache ou None).
+    A chave (tamanho, mtime em ns, hash) é obtida antes da decodificação e o hash é calculado sobre os mesmos bytes
+    decodificados: se o arquivo for trocado durante o cadastro, o encoding nunca fica registrado com a chave da nova versão.
+    """
+    try:
+        # Lê o arquivo uma única vez: a chave do cache e a imagem vêm do mesmo conteúdo
+        stat = os.stat(path)
+        with open(path, "rb") as f:
+            data = f.read()
+        key = (stat.st_size, stat.st_mtime_ns, hashlib.sha1(data).hexdigest())
+
+        # Carrega a imagem usando a biblioteca face_recognition
+        image = face_recognition.load_image_file(io.BytesIO(data))
+
+        # Extrai o encoding (vetor de características) do rosto presente na imagem
+        encodings = face_recognition.face_encodings(image)
+        return path, (encodings[0] if encodings else None), None, key
+    except Exception as e:
+        # O erro é devolvido para quem chamou, em vez de derrubar o pool inteiro
+        return path, None, str(e), None
+
+
+def encode_images(paths, workers=ENROLLMENT_WORKERS, chunk_size=ENROLLMENT_CHUNK_SIZE):
+    """
+    Extrai os encodings de uma lista de imagens, em paralelo quando houver mais de uma imagem e mais de um núcleo.
+
+    Parâmetros:
+    - paths: caminhos das imagens a codificar
+    - workers: quantidade de processos (None = todos os núcleos disponíveis)
+    - chunk_size: quantas imagens cada processo recebe por vez (limita a memória e mantém o progresso fluido)
+
+    Gera tuplas (caminho, encoding, erro, chave do cache) na mesma ordem de paths, exibindo o progresso no console.
+    """
+    total = len(paths)
+    workers = min(workers or os.cpu_count() or 1, total)
+
+    # Poucas imagens ou um único núcleo: o custo de criar processos não compensa
+    if workers <= 1:
+        results = map(encode_image, paths)
+        executor = None
+    else:
+        print(f"⚙️ Codificando {total} imagens em {workers} processos...")
+
+        # "spawn" evita herdar threads (câmera, MQTT) do processo principal, o que não é seguro com fork
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        results = executor.map(encode_image, paths, chunksize=max(1, chunk_size))
+
+    try:
+        # Reporta o progresso aproximadamente a cada 10% das imagens
+        step = max(1, total // 10)
+        for done, result in enumerate(results, start=1):
+            if done % step == 0 or done == total:
+                print(f"⏳ Cadastro: {done}/{total} imagens codificadas.")
+            yield result
+    finally:
+        if executor:
+            executor.shutdown()
@@ -6,24 +6,194 @@ Esse módulo é a base do sistema de reconhecimento facial, sendo usado normalme
 
 import face_recognition  # Biblioteca principal usada para detecção e reconhecimento facial
 import os                # Usada para manipulação de arquivos e diretórios
-from config import KNOWN_FACES_DIR  # Caminho para a pasta com imagens de rostos conhecidos (definido no config.py)
+import math              # Usado no cálculo da escala e do tamanho das regiões recortadas
+import time              # Usado para medir a latência de cada frame (ver latency_controller.py)
+import threading         # Lock que impede duas montagens da galeria ao mesmo tempo
+from collections import namedtuple  # Usado para representar o resultado de cada rosto reconhecido
+from config import (     # Pasta da galeria, limiar de distância, rastreamento e cache de identidades (definidos no config.py)
+    KNOWN_FACES_DIR, FACE_TOLERANCE, TRACKING_ENABLED, IDENTITY_CACHE_ENABLED, IDENTITY_CACHE_MIN_MARGIN,
+    MOTION_ENABLED, MOTION_REGION_MARGIN, MOTION_MAX_STATIC_FRAMES, DETECTION_ROI, DYNAMIC_ROI_ENABLED,
+    DYNAMIC_ROI_MARGIN, ROI_MAX_SCALE, ROI_FULL_SCAN_INTERVAL
+)
 import cv2               # Biblioteca OpenCV para processamento de imagem
+from encoding_cache import EncodingCache  # Cache persistente dos encodings da galeria
+from gallery import FaceGallery           # Galeria vetorizada (matriz float32) dos rostos conhecidos
+from ann_index import create_index        # Índice ANN opcional para galerias grandes
+from enrollment import encode_images      # Extração paralela dos encodings das imagens da galeria
+from tracker import FaceTracker           # Rastreador que evita detectar e codificar o rosto em todo frame
+from identity_cache import IdentityCache  # Cache de identidades por rastro, evita recodificar o mesmo rosto
+from buffer_pool import BufferPool        # Buffers reutilizáveis para o pré-processamento dos frames
+from motion import MotionDetector         # Pré-filtro de movimento que evita detectar rostos em cenas estáticas
+from latency_controller import LatencyController  # Ajuste da escala/modelo da detecção ao orçamento de latência
+from batch_encoder import encode_faces    # Encoder do dlib em lote (vários rostos e frames por chamada)
+
+# Resultado do reconhecimento de um rosto: nome (ou "Desconhecido"), caixa (top, right, bottom, left) nas coordenadas
+# do frame original, distância para a pessoa mais parecida da galeria, id do rastro (None sem rastreamento)
+# e escala da imagem em que o rosto foi detectado (a caixa já vem convertida para o frame original)
+FaceResult = namedtuple("FaceResult", ["name", "location", "distance", "track_id", "scale"])
+
+# Saída da etapa de detecção: imagem RGB da região detectada (recortada e redimensionada), localizações nessa imagem
+# (usadas no encoding), as mesmas caixas nas coordenadas do frame original, rastros associados, nos frames propagados
+# pelo rastreador os resultados prontos (sem necessidade de encoding), a escala usada, o tempo gasto na detecção
+# e o estado da câmera de origem (StreamState)
+Detection = namedtuple("Detection", ["image", "locations", "boxes", "tracks", "results", "scale", "elapsed", "stream"])
+
+# Menor lado (em pixels do frame original) da região recortada para a detecção, para caber um rosto inteiro
+MIN_DETECTION_REGION = 160
+
+# As regiões recortadas têm lados múltiplos deste valor (em pixels do frame original), para que se repitam
+# entre frames e os buffers do pool sejam reaproveitados
+REGION_STEP = 32
+
+# Extensões de imagem aceitas na galeria
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def person_name(label):
+    """
+    Converte o nome de uma pasta/arquivo no nome exibido da pessoa (ex: "joan_medeiros" -> "Joan Medeiros").
+    """
+    return label.replace('_', ' ').title()
+
+
+def list_gallery_images(directory):
+    """
+    Lista as imagens da galeria como pares (nome da pessoa, caminho), em ordem determinística.
+    Aceita dois formatos, que podem coexistir:
+    - uma pasta por pessoa: known_faces/<nome>/*.jpg (todas as fotos da pasta pertencem à pessoa)
+    - o formato antigo, um arquivo por pessoa: known_faces/<nome>.jpg
+    """
+    images = []
+    for entry in sorted(os.listdir(directory)):
+        path = os.path.join(directory, entry)
+        if os.path.isdir(path):
+            # Cada imagem dentro da pasta é uma amostra da pessoa
+            for file in sorted(os.listdir(path)):
+                if file.lower().endswith(IMAGE_EXTENSIONS):
+                    images.append((person_name(entry), os.path.join(path, file)))
+        elif entry.lower().endswith(IMAGE_EXTENSIONS):
+            # Nome da pessoa com base no nome do arquivo (sem extensão)
+            images.append((person_name(os.path.splitext(entry)[0]), path))
+    return images
+
+
+class StreamState:
+    def __init__(self, tracking, motion):
+        """
+        Estado do reconhecimento de uma câmera, que depende da ordem dos frames e por isso não é compartilhado
+        entre câmeras (a galeria, os modelos e o controle de latência são compartilhados pelo FaceRecognitionModule).
+        """
+        # Rastreador de rostos entre detecções (None quando o rastreamento está desativado)
+        self.tracker = FaceTracker() if tracking else None
+
+        # Cache de identidades por id de rastro (depende do rastreamento para ter ids estáveis)
+        self.identity_cache = IdentityCache() if tracking and IDENTITY_CACHE_ENABLED else None
+
+        # Pré-filtro de movimento (None quando desativado) e frames estáticos seguidos sem detecção
+        self.motion = MotionDetector() if motion else None
+        self.static_frames = 0
+
+        # Resultados do último frame identificado, repetidos nos frames estáticos quando não há rastreador
+        self.last_results = []
+
+        # Detecções executadas nesta câmera (usado na varredura periódica da ROI inteira)
+        self.detections = 0
+
 
 class FaceRecognitionModule:
-    def __init__(self):
-        # Lista que armazenará os vetores de características (encodings) dos rostos conhecidos
-        self.known_encodings = []
+    def __init__(self, gallery=None, tracking=TRACKING_ENABLED, motion=MOTION_ENABLED):
+        """
+        Parâmetros:
+        - gallery: galeria já montada (ex: a cópia recebida por um processo de worker_pool.py); None carrega de KNOWN_FACES_DIR
+        - tracking: ativa o rastreador e o cache de identidades (requer frames em ordem)
+        - motion: ativa o pré-filtro de movimento (requer frames em ordem)
+        """
+        # Galeria com a matriz de encodings conhecidos e os nomes associados
+        self.gallery = FaceGallery()
+
+        # Estado de cada câmera (rastros, cache de identidades, movimento), criado no primeiro frame de cada uma
+        self.tracking = tracking
+        self.use_motion = motion
+        self.streams = {}
+
+        # Buffers reutilizáveis para o frame reduzido e convertido para RGB (evita alocações a cada frame)
+        self.buffers = BufferPool()
+
+        # Controle da escala, do upsample e do modelo da detecção pelo orçamento de latência
+        self.controller = LatencyController()
+
+        # Impede duas montagens da galeria ao mesmo tempo (observador da pasta e comando de recarga, ver reload_gallery)
+        self.gallery_lock = threading.Lock()
+
+        # Distância máxima para considerar um rosto reconhecido (pode ser alterada em execução, ver command_channel.py)
+        self.tolerance = FACE_TOLERANCE
 
-        # Lista com os nomes associados a cada encoding conhecido
-        self.known_names = []
+        # Contadores de detecções executadas (em todo o frame ou recortadas na região com movimento) e puladas
+        self.detections = 0
+        self.cropped_detections = 0
+        self.skipped_detections = 0
 
-        # Carrega os rostos conhecidos da pasta especificada
-        self.load_faces()
+        # Carrega os rostos conhecidos da pasta especificada (ou usa a galeria recebida)
+        if gallery is None:
+            self.load_faces()
+        else:
+            self.swap_gallery(gallery)
+
+    def stream(self, name=None):
+        """
+        Retorna o estado da câmera indicada (None = câmera única), criando-o na primeira vez.
+        """
+        state = self.streams.get(name)
+        if state is None:
+            state = self.streams[name] = StreamState(self.tracking, self.use_motion)
+        return state
 
     def load_faces(self):
         """
-        Carrega os rostos conhecidos a partir dos arquivos de imagem encontrados no diretório KNOWN_FACES_DIR.
-        Extrai os encodings de cada rosto e armazena junto ao nome da pessoa (baseado no nome do arquivo).
+        Carrega os rostos conhecidos e instala a galeria resultante no módulo.
+        """
+        self.reload_gallery()
+
+    def reload_gallery(self, blocking=True):
+        """
+        Monta a galeria a partir de KNOWN_FACES_DIR e a instala no módulo, sob um único lock: duas recargas
+        simultâneas disputariam o pool de processos e o arquivo temporário do cache de encodings.
+
+        Com blocking=False, retorna None sem fazer nada se outra recarga estiver em andamento.
+        Retorna a nova galeria (exceções da montagem são propagadas e a galeria atual é mantida).
+        """
+        if not self.gallery_lock.acquire(blocking):
+            return None
+        try:
+            gallery = self.build_gallery()
+            self.swap_gallery(gallery)
+            return gallery
+        finally:
+            self.gallery_lock.release()
+
+    def swap_gallery(self, gallery):
+        """
+        Substitui a galeria em uso. A troca é uma única atribuição (atômica): o frame em processamento
+        termina com a galeria antiga e o próximo frame já usa a nova, sem pausar o reconhecimento.
+        """
+        self.gallery = gallery
+
+    def set_tolerance(self, tolerance):
+        """
+        Altera a tolerância de reconhecimento em execução. As identidades em cache foram decididas com a tolerância
+        anterior e são descartadas, para que os rostos em cena sejam reavaliados na próxima detecção.
+        Os caches são usados pela thread do encoding: aqui apenas se pede a limpeza (ver IdentityCache.invalidate).
+        """
+        self.tolerance = tolerance
+        for state in list(self.streams.values()):
+            if state.identity_cache:
+                state.identity_cache.invalidate()
+
+    def build_gallery(self):
+        """
+        Monta uma nova galeria a partir das imagens encontradas no diretório KNOWN_FACES_DIR.
+        Extrai o encoding de cada imagem (reaproveitando o cache) junto ao nome da pessoa (baseado no nome da pasta ou do arquivo).
+        Não altera a galeria em uso, podendo ser chamado a partir de outra thread (ver gallery_watcher.py).
         """
         print(f"🔄 Carregando rostos conhecidos de '{KNOWN_FACES_DIR}'...")
 
@@ -31,75 +201,349 @@ class FaceRecognitionModule:
         if not os.path.exists(KNOWN_FACES_DIR):
             raise Exception(f"❌ Pasta '{KNOWN_FACES_DIR}' não encontrada.")
 
-        # Percorre os arquivos da pasta
-        for file in os.listdir(KNOWN_FACES_DIR):
-            # Verifica se o arquivo é uma imagem suportada
-            if file.endswith(('.jpg', '.jpeg', '.png')):
-                # Extrai o nome da pessoa com base no nome do arquivo (sem extensão)
-                name = os.path.splitext(file)[0]
+        # Abre o cache persistente de encodings (imagens inalteradas não são recodificadas)
+        cache = EncodingCache()
+        cached = 0
+
+        # Listas temporárias usadas para montar a matriz da galeria ao final
+        known_encodings = []
+        known_names = []
+
+        # Percorre as imagens da galeria (uma pasta por pessoa ou, no formato antigo, um arquivo por pessoa)
+        images = list_gallery_images(KNOWN_FACES_DIR)
+        paths = [path for _, path in images]
 
-                # Caminho completo da imagem
-                path = os.path.join(KNOWN_FACES_DIR, file)
+        # Consulta o cache antes de decodificar qualquer imagem
+        results = {}
+        for path in paths:
+            found, encoding = cache.lookup(path)
+            if found:
+                results[path] = encoding
+                cached += 1
 
-                # Carrega a imagem usando a biblioteca face_recognition
-                image = face_recognition.load_image_file(path)
+        # Codifica apenas as imagens novas ou alteradas, distribuídas entre os núcleos da CPU
+        missing = [path for path in paths if path not in results]
+        errors = []
+        for path, encoding, error, key in encode_images(missing):
+            if error:
+                # Erros não interrompem o cadastro; a imagem será tentada de novo na próxima carga
+                errors.append((path, error))
+                continue
 
-                # Extrai o encoding (vetor de características) do rosto presente na imagem
-                encodings = face_recognition.face_encodings(image)
+            # Guarda o resultado no cache (inclusive quando nenhum rosto foi encontrado)
+            cache.store(path, encoding, key)
+            results[path] = encoding
 
-                if encodings:
-                    # Se o rosto foi detectado, salva o encoding e o nome da pessoa
-                    self.known_encodings.append(encodings[0])
-                    self.known_names.append(name.replace('_', ' ').title())
-                    print(f"✅ {name} carregado.")
-                else:
-                    # Se nenhum rosto foi detectado, emite um aviso
-                    print(f"⚠️ Nenhum rosto detectado em '{file}'.")
+        for name, path in images:
+            if path not in results:
+                continue
+
+            encoding = results[path]
+            if encoding is not None:
+                # Se o rosto foi detectado, salva o encoding e o nome da pessoa (cada foto contribui com uma amostra)
+                known_encodings.append(encoding)
+                known_names.append(name)
+                print(f"✅ {name} carregado ({os.path.basename(path)}).")
+            else:
+                # Se nenhum rosto foi detectado, emite um aviso
+                print(f"⚠️ Nenhum rosto detectado em '{path}'.")
+
+        # Relata as imagens que não puderam ser processadas
+        for path, error in errors:
+            print(f"❌ Erro ao carregar '{path}': {error}")
+
+        # Remove do cache imagens apagadas e persiste as alterações
+        cache.prune(paths)
+        cache.save()
+        print(f"🗃️ {cached} de {len(paths)} imagens carregadas do cache.")
+        print(f"👥 {len(set(known_names))} pessoas, {len(known_encodings)} amostras na galeria.")
 
         # Se nenhum encoding foi carregado, gera erro
-        if not self.known_encodings:
+        if not known_encodings:
             raise Exception("❗ Nenhum rosto válido foi carregado.")
 
+        # Converte as listas em uma matriz contígua com normas pré-calculadas
+        gallery = FaceGallery(known_encodings, known_names)
+
+        # Cria ou carrega o índice ANN (None para galerias pequenas ou ANN desativado)
+        gallery.index = create_index(gallery.indexed_matrix, gallery.indexed_ids)
+        return gallery
+
     def recognize(self, frame):
         """
         Recebe um frame (imagem da câmera), redimensiona e converte para RGB.
-        Detecta o rosto e compara com os rostos conhecidos.
-        Retorna o nome da pessoa reconhecida (ou 'Desconhecido') e a localização do rosto no frame.
+        Detecta todos os rostos e compara com os rostos conhecidos em uma única matriz de distâncias.
+        Retorna uma lista de FaceResult (nome ou 'Desconhecido', localização, distância, id do rastro),
+        uma para cada rosto do frame; a lista é vazia quando nenhum rosto é detectado.
+
+        Equivale a identify(detect(frame)); as duas etapas podem rodar em threads diferentes (ver pipeline.py).
         """
+        return self.identify(self.detect(frame))
 
-        # Reduz o tamanho da imagem para acelerar o processamento (reduz para 25%)
-        small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
+    def detect(self, frame, setting=None, stream=None):
+        """
+        Etapa de detecção: recorta a região de interesse, redimensiona, converte para RGB e localiza os rostos,
+        associando-os aos rastros.
+
+        A detecção roda apenas dentro da ROI estática (DETECTION_ROI) e, com a ROI dinâmica, apenas ao redor dos rostos
+        já conhecidos e da região com movimento. Quanto menor o recorte, maior a escala usada (até ROI_MAX_SCALE),
+        o que mantém o custo do HOG e melhora a detecção de rostos distantes.
+        Com o pré-filtro de movimento ativo, frames estáticos não passam pela detecção (os rostos já conhecidos são mantidos).
+        Com o rastreamento ativo, a detecção e o encoding rodam apenas a cada DETECTION_INTERVAL_FRAMES frames;
+        nos demais, as caixas e identidades são propagadas pelo rastreador (cada frame rastreado conta no debounce).
+
+        O parâmetro setting (DetectionSetting) substitui o nível do controle de latência (ver worker_pool.py) e stream
+        identifica a câmera de origem, cujo estado (rastros, movimento, ROI) é mantido separadamente (ver multi_camera.py).
+
+        Retorna um Detection, que deve ser passado para identify() na mesma ordem dos frames de cada câmera.
+        """
+        frame_size = frame.shape[:2]
+        state = self.stream(stream)
+
+        # Cena estática: mantém os rostos atuais sem detecção nem encoding (exceto a detecção periódica de segurança)
+        motion = state.motion.update(frame) if state.motion else None
+        static = state.motion and motion is None
+        region = self._detection_region(state, motion, frame_size, full_scan=static)
+        if (region is None or static) and state.static_frames < MOTION_MAX_STATIC_FRAMES and self._identities_known(state):
+            state.static_frames += 1
+            self.skipped_detections += 1
+            if state.tracker:
+                results = [FaceResult(track.name, track.location, track.distance, track.id, track.scale) for track in state.tracker.hold()]
+            else:
+                results = state.last_results
+            return Detection(None, [], [], [], results, None, 0.0, state)
+
+        # Frames intermediários: apenas propaga os rastros existentes, sem detecção nem encoding
+        if state.tracker and not state.tracker.needs_detection(frame_size):
+            results = [FaceResult(track.name, track.location, track.distance, track.id, track.scale) for track in state.tracker.predict()]
+            return Detection(None, [], [], [], results, None, 0.0, state)
 
-        # Converte o frame de BGR (padrão OpenCV) para RGB (padrão face_recognition)
-        rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+        # Movimento apenas fora da ROI, mas a detecção de segurança é necessária: examina a ROI inteira
+        if region is None:
+            region = self._detection_region(state, None, frame_size, full_scan=True)
+        top, right, bottom, left = region
+        started = time.time()
 
-        # Detecta as localizações dos rostos no frame
-        locations = face_recognition.face_locations(rgb_small_frame)
+        # Escala que mantém a quantidade de pixels de um frame inteiro na escala do nível atual (recortes menores são
+        # ampliados); o nível é escolhido pelo controle de latência
+        setting = setting or self.controller.setting
+        scale = min(ROI_MAX_SCALE, setting.scale * math.sqrt(frame_size[0] * frame_size[1] / ((bottom - top) * (right - left))))
+        size = (max(1, round((bottom - top) * scale)), max(1, round((right - left) * scale)))
 
-        # Extrai os encodings dos rostos detectados nas localizações encontradas
-        encodings = face_recognition.face_encodings(rgb_small_frame, locations)
+        # Recorta e redimensiona a região em um buffer reutilizável
+        small_frame = self.buffers.acquire((size[0], size[1], 3))
+        rgb_small_frame = None
+        detection = None
+        try:
+            cv2.resize(frame[top:bottom, left:right], (size[1], size[0]), dst=small_frame, interpolation=cv2.INTER_AREA)
 
-        # Se nenhum encoding for encontrado, retorna None
-        if not encodings:
-            return None, None
+            # Converte o frame de BGR (padrão OpenCV) para RGB (padrão face_recognition), também sem alocar
+            rgb_small_frame = self.buffers.acquire(small_frame.shape)
+            cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB, dst=rgb_small_frame)
+            self.buffers.release(small_frame)
+            small_frame = None
 
-        # Considera apenas o primeiro rosto detectado (útil em ambientes com uma pessoa por vez)
-        face_encoding = encodings[0]
+            # Detecta as localizações dos rostos na região recortada
+            state.static_frames = 0
+            state.detections += 1
+            self.detections += 1
+            if (top, right, bottom, left) != (0, frame_size[1], frame_size[0], 0):
+                self.cropped_detections += 1
+            locations = face_recognition.face_locations(rgb_small_frame, setting.upsample, setting.model)
 
-        # Calcula a distância de similaridade entre o encoding detectado e todos os conhecidos
-        distances = face_recognition.face_distance(self.known_encodings, face_encoding)
+            # Converte as caixas para as coordenadas do frame original
+            boxes = [(top + round(t / scale), left + round(r / scale), top + round(b / scale), left + round(l / scale))
+                     for t, r, b, l in locations]
+
+            # Associa as detecções aos rastros existentes (mantém ids estáveis entre frames)
+            tracks = state.tracker.update(boxes) if state.tracker else [None] * len(boxes)
+
+            # Guarda nos rastros a escala da detecção, repetida nos frames propagados
+            for track in tracks:
+                if track:
+                    track.scale = scale
+
+            detection = Detection(rgb_small_frame, locations, boxes, tracks, None, scale, time.time() - started, state)
+            return detection
+        finally:
+            # Em caso de erro, os buffers voltam para o pool (com sucesso, a imagem RGB é devolvida por identify())
+            if detection is None:
+                self.buffers.release(small_frame)
+                self.buffers.release(rgb_small_frame)
+
+    def _identities_known(self, state):
+        """
+        Indica se todos os rostos visíveis já têm identidade (condição para pular a detecção em uma cena estática).
+        """
+        if not state.tracker:
+            return True
+        return all(track.name is not None for track in state.tracker.tracks if track.misses == 0)
 
-        # Se não houver rostos conhecidos, retorna como "Desconhecido"
+    def _static_roi(self, frame_size):
+        """
+        Converte a ROI estática (frações do frame, ver DETECTION_ROI) para pixels; sem ROI configurada, o frame inteiro.
+        """
+        height, width = frame_size
+        if not DETECTION_ROI:
+            return (0, width, height, 0)
+        top, right, bottom, left = DETECTION_ROI
+        return (int(top * height), int(math.ceil(right * width)), int(math.ceil(bottom * height)), int(left * width))
+
+    def _detection_region(self, state, motion, frame_size, full_scan=False):
+        """
+        Escolhe a região do frame (top, right, bottom, left) em que os rostos serão procurados.
+
+        A ROI dinâmica é a união das caixas dos rastros visíveis (que precisam ser redetectados para não serem perdidos)
+        e da região com movimento, cada uma com a sua margem, limitada à ROI estática.
+        A ROI estática inteira é usada quando full_scan é verdadeiro, com a ROI dinâmica desativada ou, sem o filtro
+        de movimento, quando não há rastros e a cada ROI_FULL_SCAN_INTERVAL detecções (para encontrar quem chega).
+
+        Retorna None se a única alteração da cena aconteceu fora da ROI estática.
+        """
+        height, width = frame_size
+        roi = self._static_roi(frame_size)
+        if full_scan or not DYNAMIC_ROI_ENABLED:
+            return roi
+
+        boxes = []
+        if state.tracker:
+            boxes += [self._expand(track.box, DYNAMIC_ROI_MARGIN) for track in state.tracker.tracks if track.misses == 0]
+        if motion:
+            boxes.append(self._expand(motion, MOTION_REGION_MARGIN))
+        elif not boxes or state.detections % ROI_FULL_SCAN_INTERVAL == 0:
+            return roi
+
+        # União das caixas, limitada à ROI estática
+        top = max(roi[0], min(box[0] for box in boxes))
+        right = min(roi[1], max(box[1] for box in boxes))
+        bottom = min(roi[2], max(box[2] for box in boxes))
+        left = max(roi[3], min(box[3] for box in boxes))
+        if bottom <= top or right <= left:
+            return None
+
+        # Arredonda o tamanho para cima (múltiplo de REGION_STEP, mínimo MIN_DETECTION_REGION), centralizado na região
+        # e deslocado para dentro da ROI quando ultrapassa a borda
+        region_height = min(roi[2] - roi[0], max(MIN_DETECTION_REGION, REGION_STEP * math.ceil((bottom - top) / REGION_STEP)))
+        region_width = min(roi[1] - roi[3], max(MIN_DETECTION_REGION, REGION_STEP * math.ceil((right - left) / REGION_STEP)))
+        top = min(max(roi[0], int((top + bottom - region_height) / 2)), roi[2] - region_height)
+        left = min(max(roi[3], int((left + right - region_width) / 2)), roi[1] - region_width)
+        return (top, left + region_width, top + region_height, left)
+
+    @staticmethod
+    def _expand(box, margin):
+        """
+        Expande uma caixa (top, right, bottom, left) em cada lado por uma fração do seu tamanho.
+        """
+        top, right, bottom, left = box
+        margin_y, margin_x = margin * (bottom - top), margin * (right - left)
+        return (top - margin_y, right + margin_x, bottom + margin_y, left - margin_x)
+
+    def identify(self, detection):
+        """
+        Etapa de encoding e comparação: extrai os encodings dos rostos detectados (exceto os que têm identidade em cache)
+        e compara todos com a galeria. Retorna a lista de FaceResult do frame.
+        """
+        return self.identify_batch([detection])[0]
+
+    def identify_batch(self, detections):
+        """
+        Etapa de encoding e comparação para vários frames de uma vez (de uma ou mais câmeras, ver pipeline.py):
+        os rostos sem identidade em cache de todos os frames são codificados em um único lote do encoder do dlib
+        e comparados com a galeria em uma única multiplicação de matrizes.
+
+        Retorna, para cada Detection, a lista de FaceResult do frame, na mesma ordem.
+        """
+        started = time.time()
+        outputs = [None] * len(detections)
+        jobs = []
+        try:
+            for index, detection in enumerate(detections):
+                # Frame propagado pelo rastreador: as identidades já são conhecidas
+                if detection.results is not None:
+                    outputs[index] = detection.results
+                    continue
+                jobs.append((index, detection) + self._cached_identities(detection))
+
+            # Extrai em um único lote os encodings dos rostos sem identidade em cache, de todos os frames
+            encodings = encode_faces([detection.image for _, detection, _, pending in jobs],
+                                     [[detection.locations[i] for i in pending] for _, detection, _, pending in jobs])
+
+            # Compara todos esses rostos com toda a galeria de uma vez
+            # (a referência local garante que o lote inteiro use a mesma galeria, mesmo durante uma recarga)
+            # (o mesmo vale para a tolerância, que pode ser alterada por um comando durante o lote)
+            gallery = self.gallery
+            tolerance = self.tolerance
+            queries = [encoding for frame in encodings for encoding in frame]
+            ids, distances = gallery.match(queries, k=2) if queries else ((), ())
+
+            row = 0
+            for (index, detection, identities, pending), frame in zip(jobs, encodings):
+                identity_cache = detection.stream.identity_cache
+                for i in pending:
+                    name, distance, margin = self._identify(gallery, ids[row], distances[row], tolerance)
+                    identities[i] = (name, distance)
+                    row += 1
+
+                    # Só identidades inequívocas dispensam o encoding nos próximos frames
+                    if detection.tracks[i] and identity_cache and margin >= IDENTITY_CACHE_MIN_MARGIN:
+                        identity_cache.put(detection.tracks[i].id, name, distance, detection.boxes[i])
+
+                outputs[index] = detection.stream.last_results = self._results(detection, identities)
+
+                # Latência do frame: detecção + encoding do lote (sem o tempo de espera nas filas do pipeline)
+                self.controller.observe(detection.elapsed + time.time() - started)
+            return outputs
+        finally:
+            # As imagens recortadas não são mais necessárias: os buffers voltam para o pool
+            for detection in detections:
+                self.buffers.release(detection.image)
+
+    def _cached_identities(self, detection):
+        """
+        Reaproveita a identidade de rostos já reconhecidos com boa margem que não se moveram.
+        Retorna (identidades, com None nos rostos sem cache; índices dos rostos que precisam de encoding).
+        """
+        identity_cache = detection.stream.identity_cache
+        identities = [None] * len(detection.locations)
+        pending = []
+        for i, track in enumerate(detection.tracks):
+            cached = identity_cache.get(track.id, detection.boxes[i]) if track and identity_cache else None
+            if cached:
+                identities[i] = cached
+            else:
+                pending.append(i)
+        return identities, pending
+
+    def _results(self, detection, identities):
+        """
+        Monta a lista de FaceResult de um frame e guarda as identidades nos rastros, para serem propagadas.
+        As localizações da detecção se referem à imagem recortada (usada no encoding); as caixas, ao frame original.
+        """
+        results = []
+        for box, track, (name, distance) in zip(detection.boxes, detection.tracks, identities):
+            if track:
+                track.name, track.distance = name, distance
+            results.append(FaceResult(name, box, distance, track.id if track else None, detection.scale))
+        return results
+
+    def _identify(self, gallery, ids, distances, tolerance):
+        """
+        Decide a identidade de um rosto a partir das duas pessoas mais parecidas da galeria.
+
+        Retorna (nome, distância, margem), em que a margem indica o quão inequívoca é a decisão:
+        a distância até a tolerância e, para rostos reconhecidos, a vantagem sobre a segunda pessoa mais parecida.
+        """
         if len(distances) == 0:
-            return "Desconhecido", locations[0]
+            return "Desconhecido", None, 0.0
 
-        # Encontra o rosto conhecido com menor distância (mais parecido)
-        best_match = min(enumerate(distances), key=lambda x: x[1])
-        index, distance = best_match
+        distance = float(distances[0])
+        margin = abs(tolerance - distance)
 
-        # Se a distância for menor que 0.6 (limiar), considera que houve correspondência
-        if distance < 0.6:
-            return self.known_names[index], locations[0]
+        # Se a distância for menor que a tolerância configurada, considera que houve correspondência
+        if distance < tolerance:
+            if len(distances) > 1:
+                margin = min(margin, float(distances[1]) - distance)
+            return gallery.names[ids[0]], distance, margin
 
-        # Caso contrário, retorna "Desconhecido"
-        return "Desconhecido", locations[0]
+        # Caso contrário, o rosto é "Desconhecido"
+        return "Desconhecido", distance, margin
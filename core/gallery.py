@@ -0,0 +1,293 @@
+# gallery.py
+
+"""
+O arquivo gallery.py define a classe FaceGallery, que guarda os rostos conhecidos em uma matriz contígua float32 (N, 128)
+com as normas ao quadrado pré-calculadas e um vetor paralelo com o id do nome de cada encoding.
+Assim, todos os rostos de um frame são comparados com toda a galeria em uma única multiplicação de matrizes (BLAS),
+em vez de iterar em Python sobre listas de encodings.
+
+Cada pessoa pode ter vários encodings (uma imagem por foto cadastrada). No modo "centroid" ou "medoid" o rosto é comparado
+primeiro com um representante por pessoa e, depois, apenas com as amostras das pessoas mais próximas, de modo que cadastrar
+mais fotos melhora a precisão sem multiplicar o custo por frame.
+"""
+
+import hashlib           # Rótulos estáveis das linhas indexadas pelo ANN
+import numpy as np       # Biblioteca de álgebra linear usada para a comparação vetorizada
+from config import GALLERY_MATCH_MODE, GALLERY_SHORTLIST  # Estratégia de comparação da galeria (definida no config.py)
+
+# Dimensão do vetor de características gerado pelo encoder do dlib
+ENCODING_SIZE = 128
+
+
+def squared_norms(matrix):
+    """
+    Normas ao quadrado de cada linha de uma matriz (||x||²).
+    """
+    return np.einsum("ij,ij->i", matrix, matrix)
+
+
+def pairwise_distances(queries, points, point_norms):
+    """
+    Matriz de distâncias euclidianas (M, N) usando ||q - g||² = ||q||² + ||g||² - 2·q·g,
+    de modo que o custo é dominado por uma única multiplicação de matrizes.
+    """
+    squared = squared_norms(queries)[:, None] + point_norms[None, :] - 2.0 * (queries @ points.T)
+
+    # Erros de arredondamento podem gerar valores levemente negativos
+    np.maximum(squared, 0.0, out=squared)
+    return np.sqrt(squared, out=squared)
+
+
+def stable_ids(names, matrix):
+    """
+    Retorna um rótulo estável para cada linha da matriz, derivado do nome e do conteúdo do vetor (e não da posição),
+    usado pelo índice ANN: a mesma amostra mantém o rótulo entre duas versões da galeria, então apenas as amostras
+    novas ou removidas precisam ser atualizadas no índice (ver ann_index.create_index).
+    """
+    ids = np.empty(len(matrix), dtype=np.int64)
+    seen = set()
+    for i, (name, row) in enumerate(zip(names, np.ascontiguousarray(matrix, dtype=np.float32))):
+        digest = hashlib.sha1(name.encode() + row.tobytes()).digest()
+        label = int.from_bytes(digest[:8], "little") >> 1
+
+        # Amostras idênticas da mesma pessoa (ex: foto copiada) recebem rótulos consecutivos
+        while label in seen:
+            label = (label + 1) % (1 << 63)
+        seen.add(label)
+        ids[i] = label
+    return ids
+
+
+class FaceGallery:
+    def __init__(self, encodings=(), names=(), mode=GALLERY_MATCH_MODE, shortlist=GALLERY_SHORTLIST):
+        # Lista de nomes únicos; o índice na lista é o id do nome
+        self.names = []
+
+        # Mapa nome -> id, para montar o vetor de ids rapidamente
+        self.name_index = {}
+
+        # Converte os encodings para uma matriz float32 (N, 128)
+        matrix = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+
+        # Vetor com o id do nome de cada encoding
+        name_ids = np.array([self._name_id(name) for name in names], dtype=np.int32)
+
+        if len(name_ids) != len(matrix):
+            raise ValueError("❌ A quantidade de nomes e de encodings da galeria é diferente.")
+
+        # Ordena as linhas por pessoa, para que as amostras de cada uma fiquem contíguas na matriz
+        order = np.argsort(name_ids, kind="stable")
+        self.matrix = np.ascontiguousarray(matrix[order])
+        self.name_ids = name_ids[order]
+
+        # Normas ao quadrado de cada encoding (||g||²), calculadas uma única vez
+        self.norms = squared_norms(self.matrix)
+
+        # Intervalo de linhas [offsets[i], offsets[i + 1]) com as amostras da pessoa i
+        self.offsets = np.searchsorted(self.name_ids, np.arange(len(self.names) + 1)).astype(np.int64)
+
+        # Estratégia de comparação: "all" (todas as amostras), "centroid" ou "medoid" (representante por pessoa primeiro)
+        self.mode = mode
+
+        # Quantas pessoas mais próximas do representante têm suas amostras comparadas na segunda etapa
+        self.shortlist = shortlist
+
+        # Um representante por pessoa (média das amostras ou amostra mais central)
+        self.representatives = self._representatives(mode)
+        self.representative_norms = squared_norms(self.representatives)
+
+        # Índice ANN opcional (ver ann_index.py); None significa busca exata
+        self.index = None
+
+        # Rótulos estáveis das linhas indexadas e a ordem que os converte de volta em linhas (calculados sob demanda)
+        self._indexed_ids = None
+        self._indexed_order = None
+
+    def _representatives(self, mode):
+        """
+        Calcula o representante de cada pessoa: o centróide (média) das amostras ou o medoide
+        (a amostra com a menor soma de distâncias às demais amostras da mesma pessoa).
+        """
+        representatives = np.empty((len(self.names), ENCODING_SIZE), dtype=np.float32)
+        for person in range(len(self.names)):
+            samples = self.matrix[self.offsets[person]:self.offsets[person + 1]]
+            if mode == "medoid":
+                distances = pairwise_distances(samples, samples, squared_norms(samples))
+                representatives[person] = samples[np.argmin(distances.sum(axis=1))]
+            else:
+                representatives[person] = samples.mean(axis=0)
+        return representatives
+
+    def _name_id(self, name):
+        """
+        Retorna o id de um nome, registrando-o caso ainda não exista.
+        """
+        if name not in self.name_index:
+            self.name_index[name] = len(self.names)
+            self.names.append(name)
+        return self.name_index[name]
+
+    @property
+    def indexed_matrix(self):
+        """
+        Matriz que deve ser indexada pelo ANN: os representantes por pessoa nos modos "centroid"/"medoid"
+        (a etapa 1 da comparação) ou todas as amostras no modo "all".
+        """
+        if self.mode in ("centroid", "medoid"):
+            return self.representatives
+        return self.matrix
+
+    @property
+    def indexed_ids(self):
+        """
+        Rótulos estáveis das linhas de indexed_matrix (ver stable_ids), usados pelo índice ANN.
+        """
+        if self._indexed_ids is None:
+            if self.mode in ("centroid", "medoid"):
+                names = self.names
+            else:
+                names = [self.names[i] for i in self.name_ids]
+            self._indexed_ids = stable_ids(names, self.indexed_matrix)
+            self._indexed_order = np.argsort(self._indexed_ids)
+        return self._indexed_ids
+
+    def _indexed_rows(self, labels):
+        """
+        Converte os rótulos retornados pelo índice ANN nas linhas correspondentes de indexed_matrix.
+        """
+        ids = self.indexed_ids
+        order = self._indexed_order
+        return order[np.searchsorted(ids, labels, sorter=order)]
+
+    def __len__(self):
+        # Quantidade de encodings armazenados na galeria
+        return len(self.matrix)
+
+    def distances(self, encodings):
+        """
+        Calcula a matriz de distâncias euclidianas (M, N) entre M encodings de consulta e os N encodings da galeria
+        (todas as consultas contra toda a galeria em uma chamada BLAS).
+        """
+        queries = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        return pairwise_distances(queries, self.matrix, self.norms)
+
+    def match(self, encodings, k=1):
+        """
+        Compara todos os encodings de um frame com toda a galeria.
+
+        Parâmetros:
+        - encodings: lista ou matriz (M, 128) com os encodings dos rostos detectados
+        - k: quantidade de melhores correspondências retornadas por rosto
+
+        Retorna uma tupla (ids, distâncias), ambas com formato (M, k), ordenadas da menor para a maior distância.
+        Os ids são índices em self.names; cada pessoa aparece no máximo uma vez.
+        """
+        # Com várias amostras por pessoa, compara primeiro com os representantes e depois só com as pessoas mais próximas
+        if self.mode in ("centroid", "medoid") and len(self) > len(self.names) > 0:
+            return self.match_people(encodings, k)
+
+        # Com um índice ANN, apenas os grupos mais próximos de cada consulta são comparados
+        if self.index is not None and len(self) > 0:
+            result = self._match_index(encodings, k)
+            if result is not None:
+                return result
+
+        distances = self.distances(encodings)
+        count = len(distances)
+
+        # Galeria vazia: nenhuma correspondência possível
+        if len(self) == 0:
+            return np.empty((count, 0), dtype=np.int32), np.empty((count, 0), dtype=np.float32)
+
+        # Com várias amostras por pessoa, a distância de cada pessoa é a da sua amostra mais parecida
+        # (as linhas de uma mesma pessoa são contíguas, então basta uma redução por intervalo)
+        if len(self) > len(self.names):
+            distances = np.minimum.reduceat(distances, self.offsets[:-1], axis=1)
+            ids = np.arange(len(self.names), dtype=np.int32)
+        else:
+            ids = self.name_ids
+
+        columns = distances.shape[1]
+        k = min(k, columns)
+
+        # Seleciona os k menores sem ordenar a linha inteira (O(N) em vez de O(N log N))
+        if k < columns:
+            rows = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        else:
+            rows = np.broadcast_to(np.arange(columns), (count, k))
+
+        # Ordena apenas os k selecionados
+        top = np.take_along_axis(distances, rows, axis=1)
+        order = np.argsort(top, axis=1)
+        rows = np.take_along_axis(rows, order, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+
+        return ids[rows], top
+
+    def _match_index(self, encodings, k):
+        """
+        Busca pelo índice ANN no modo "all", em que o índice contém todas as amostras. Como uma mesma pessoa pode
+        ocupar várias posições entre os vizinhos, são buscadas k vezes a maior quantidade de amostras de uma pessoa
+        (o que garante k pessoas distintas, se existirem) e mantida apenas a amostra mais próxima de cada pessoa.
+
+        Retorna (ids, distâncias) como match(), ou None se o índice não puder responder (usa-se a busca exata).
+        """
+        k = min(k, len(self.names))
+        per_person = int(np.diff(self.offsets).max())
+        result = self.index.search(np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE),
+                                   min(k * per_person, len(self)))
+        if result is None:
+            return None
+        rows, top = self._indexed_rows(result[0]), result[1]
+
+        ids = np.empty((len(rows), k), dtype=np.int32)
+        distances = np.empty((len(rows), k), dtype=np.float32)
+        for i in range(len(rows)):
+            # Os vizinhos vêm ordenados por distância: a primeira ocorrência de cada pessoa é a sua melhor amostra
+            people, first = np.unique(self.name_ids[rows[i]], return_index=True)
+            if len(people) < k:
+                return None
+            first = np.sort(first)[:k]
+            ids[i] = self.name_ids[rows[i][first]]
+            distances[i] = top[i][first]
+        return ids, distances
+
+    def match_people(self, encodings, k=1):
+        """
+        Comparação em duas etapas: (1) distância a um representante por pessoa, em uma multiplicação de matrizes (M, P);
+        (2) distância exata apenas às amostras das GALLERY_SHORTLIST pessoas mais próximas.
+        A distância de cada pessoa é a da sua amostra mais parecida, como na comparação completa.
+
+        Retorna (ids, distâncias) com formato (M, k), como match().
+        """
+        queries = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        people = len(self.names)
+        shortlist = min(max(self.shortlist, k), people)
+        k = min(k, people)
+
+        # Etapa 1: pessoas cujo representante está mais próximo de cada rosto (via índice ANN, se houver)
+        result = self.index.search(queries, shortlist) if self.index is not None else None
+        if result is not None:
+            candidates = self._indexed_rows(result[0])
+        elif shortlist < people:
+            coarse = pairwise_distances(queries, self.representatives, self.representative_norms)
+            candidates = np.argpartition(coarse, shortlist - 1, axis=1)[:, :shortlist]
+        else:
+            candidates = np.broadcast_to(np.arange(people), (len(queries), people))
+
+        ids = np.empty((len(queries), k), dtype=np.int32)
+        distances = np.empty((len(queries), k), dtype=np.float32)
+        for i, query in enumerate(queries):
+            # Etapa 2: distância exata apenas às amostras das pessoas pré-selecionadas
+            rows = np.concatenate([np.arange(self.offsets[p], self.offsets[p + 1]) for p in candidates[i]])
+            sample_distances = pairwise_distances(query[None, :], self.matrix[rows], self.norms[rows])[0]
+
+            # Menor distância de cada pessoa (as linhas de uma mesma pessoa são contíguas)
+            sizes = self.offsets[candidates[i] + 1] - self.offsets[candidates[i]]
+            best = np.minimum.reduceat(sample_distances, np.concatenate([[0], np.cumsum(sizes)[:-1]]))
+
+            order = np.argsort(best)[:k]
+            ids[i] = candidates[i][order]
+            distances[i] = best[order]
+
+        return ids, distances
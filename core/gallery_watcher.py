@@ -0,0 +1,95 @@
+# gallery_watcher.py
+
+"""
+O arquivo gallery_watcher.py define a classe GalleryWatcher, que observa o diretório KNOWN_FACES_DIR em segundo plano
+(verificando periodicamente a lista de imagens, tamanhos e datas de modificação). Quando um morador é adicionado ou removido,
+a nova galeria é montada em uma thread separada (apenas as imagens alteradas são recodificadas, graças ao cache de encodings)
+e trocada de forma atômica no FaceRecognitionModule, sem reiniciar a câmera, o MQTT ou o estado do debounce.
+"""
+
+import os                 # Usado para obter tamanho e data de modificação das imagens
+import threading          # Usado para executar a verificação em segundo plano
+from config import KNOWN_FACES_DIR, GALLERY_WATCH_INTERVAL_SECONDS, GALLERY_WATCH_STOP_SECONDS  # Pasta, intervalo e espera no encerramento
+from face_recognition_module import list_gallery_images  # Lista as imagens da galeria no mesmo formato usado no carregamento
+
+
+def gallery_snapshot(directory):
+    """
+    Retorna um retrato do estado da galeria: caminho -> (tamanho, mtime em ns).
+    Qualquer diferença entre dois retratos indica que a galeria precisa ser recarregada.
+    """
+    snapshot = {}
+    for _, path in list_gallery_images(directory):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            # O arquivo foi removido entre a listagem e a leitura; será tratado na próxima verificação
+            continue
+        snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+    return snapshot
+
+
+class GalleryWatcher:
+    def __init__(self, face_module, directory=KNOWN_FACES_DIR, interval=GALLERY_WATCH_INTERVAL_SECONDS):
+        # Módulo de reconhecimento cuja galeria será atualizada
+        self.face_module = face_module
+
+        # Diretório observado e intervalo entre verificações (em segundos)
+        self.directory = directory
+        self.interval = interval
+
+        # Estado da galeria no último carregamento bem-sucedido
+        self.snapshot = gallery_snapshot(directory)
+
+        # Evento usado para encerrar a thread sem esperar o intervalo inteiro
+        self.stop_event = threading.Event()
+
+        # Thread de observação (daemon: não impede o encerramento do programa)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """
+        Método executado pela thread: verifica a galeria periodicamente e recarrega quando houver mudanças.
+        """
+        while not self.stop_event.wait(self.interval):
+            try:
+                snapshot = gallery_snapshot(self.directory)
+            except FileNotFoundError:
+                print(f"⚠️ Pasta '{self.directory}' não encontrada. Mantendo a galeria atual.")
+                continue
+
+            if snapshot != self.snapshot:
+                self.reload(snapshot)
+
+    def reload(self, snapshot):
+        """
+        Monta a nova galeria fora do loop de reconhecimento e a instala no módulo.
+        Se a nova galeria for inválida (ex: nenhum rosto), a galeria atual é mantida.
+        """
+        added = len(snapshot.keys() - self.snapshot.keys())
+        removed = len(self.snapshot.keys() - snapshot.keys())
+        changed = sum(1 for path in snapshot.keys() & self.snapshot.keys() if snapshot[path] != self.snapshot[path])
+        print(f"🔁 Galeria alterada ({added} novas, {removed} removidas, {changed} modificadas). Recarregando...")
+
+        # Registra o novo estado antes de montar a galeria, para não repetir uma recarga inválida a cada verificação
+        self.snapshot = snapshot
+
+        try:
+            # Espera uma recarga em andamento (ex: comando "reenroll") em vez de montar duas galerias ao mesmo tempo
+            gallery = self.face_module.reload_gallery()
+        except Exception as e:
+            print(f"❌ Falha ao recarregar a galeria, mantendo a atual: {e}")
+            return
+
+        print(f"✅ Galeria recarregada: {len(gallery.names)} pessoas, {len(gallery)} amostras.")
+
+    def stop(self, timeout=GALLERY_WATCH_STOP_SECONDS):
+        """
+        Encerra a thread de observação, esperando no máximo timeout segundos. Uma recarga em andamento pode levar
+        minutos; nesse caso a thread (daemon) é abandonada e termina junto com o programa.
+        """
+        self.stop_event.set()
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            print("⚠️ Recarga da galeria em andamento interrompida pelo encerramento.")
@@ -0,0 +1,84 @@
+# identity_cache.py
+
+"""
+O arquivo identity_cache.py define a classe IdentityCache, um cache de curta duração das identidades já reconhecidas,
+indexado pelo id do rastro (ver tracker.py). Enquanto um morador está parado na porta, o rosto já identificado com boa
+margem não precisa passar de novo pelo encoder do dlib: a identidade é reaproveitada até a caixa se mover demais
+(IoU abaixo do limite) ou a entrada expirar. As entradas menos usadas são descartadas primeiro (LRU).
+"""
+
+import time                              # Usado para controlar a validade (TTL) das entradas
+from collections import OrderedDict      # Dicionário ordenado usado para a política LRU
+from config import IDENTITY_CACHE_TTL_SECONDS, IDENTITY_CACHE_MIN_IOU, IDENTITY_CACHE_SIZE  # Parâmetros do cache
+from tracker import iou                  # Sobreposição entre caixas, usada para detectar deslocamento do rosto
+
+
+class IdentityCache:
+    def __init__(self, ttl=IDENTITY_CACHE_TTL_SECONDS, min_iou=IDENTITY_CACHE_MIN_IOU, capacity=IDENTITY_CACHE_SIZE):
+        # Tempo máximo (em segundos) que uma identidade é reaproveitada sem novo encoding
+        self.ttl = ttl
+
+        # Sobreposição mínima entre a caixa atual e a caixa do momento da identificação
+        self.min_iou = min_iou
+
+        # Quantidade máxima de rastros guardados
+        self.capacity = capacity
+
+        # id do rastro -> (nome, distância, caixa no momento da identificação, instante da identificação)
+        self.entries = OrderedDict()
+
+        # Contadores para acompanhar a eficácia do cache
+        self.hits = 0
+        self.misses = 0
+
+        # Pedido de limpeza vindo de outra thread (ver invalidate); as entradas só são alteradas por quem usa o cache
+        self.invalidated = False
+
+    def invalidate(self):
+        """
+        Pede o descarte de todas as entradas (ex: a tolerância mudou). Pode ser chamado de qualquer thread:
+        apenas marca o pedido, e a limpeza é feita na próxima chamada de get() ou put(), pela thread do encoding.
+        """
+        self.invalidated = True
+
+    def _apply_invalidation(self):
+        """
+        Descarta as entradas se uma limpeza foi pedida por invalidate().
+        """
+        if self.invalidated:
+            self.invalidated = False
+            self.entries.clear()
+
+    def get(self, track_id, box, now=None):
+        """
+        Retorna (nome, distância) da identidade guardada para o rastro, ou None se não houver entrada válida.
+        Entradas expiradas ou cuja caixa se deslocou demais são descartadas.
+        """
+        self._apply_invalidation()
+        now = time.time() if now is None else now
+        entry = self.entries.get(track_id)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        name, distance, cached_box, timestamp = entry
+        if now - timestamp > self.ttl or iou(box, cached_box) < self.min_iou:
+            del self.entries[track_id]
+            self.misses += 1
+            return None
+
+        # Marca a entrada como usada recentemente
+        self.entries.move_to_end(track_id)
+        self.hits += 1
+        return name, distance
+
+    def put(self, track_id, name, distance, box, now=None):
+        """
+        Guarda a identidade de um rastro, descartando a entrada usada há mais tempo se o cache estiver cheio.
+        """
+        self._apply_invalidation()
+        self.entries[track_id] = (name, distance, tuple(box), time.time() if now is None else now)
+        self.entries.move_to_end(track_id)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
@@ -0,0 +1,121 @@
+# latency_controller.py
+
+"""
+O arquivo latency_controller.py define a classe LatencyController, que ajusta a resolução da detecção ao hardware:
+mede a latência de reconhecimento de cada frame (detecção + encoding) e compara com um orçamento (LATENCY_BUDGET_MS).
+Acima do orçamento, desce um nível (escala menor, menos upsample); com folga, sobe um nível (rostos menores e mais
+distantes passam a ser detectados). O modelo CNN do dlib só entra nos níveis quando há GPU (CUDA) disponível.
+"""
+
+from collections import namedtuple  # Usado para representar cada nível de qualidade da detecção
+from config import (                # Parâmetros do controle adaptativo (definidos no config.py)
+    SCALE_FACTOR, ADAPTIVE_SCALE_ENABLED, ADAPTIVE_SCALE_LEVELS, LATENCY_BUDGET_MS, ADAPTIVE_COOLDOWN_FRAMES
+)
+
+# Configuração da detecção: escala aplicada ao frame, quantidade de upsamples do detector e modelo ("hog" ou "cnn")
+DetectionSetting = namedtuple("DetectionSetting", ["scale", "upsample", "model"])
+
+# Fração do orçamento abaixo da qual a latência é considerada folgada (permite subir de nível)
+HEADROOM = 0.6
+
+# Peso de cada nova medição na média móvel exponencial da latência
+SMOOTHING = 0.2
+
+
+def cnn_available():
+    """
+    Indica se o modelo CNN pode ser usado em tempo real (dlib compilado com CUDA e ao menos uma GPU).
+    """
+    try:
+        import dlib
+        return bool(dlib.DLIB_USE_CUDA) and dlib.cuda.get_num_devices() > 0
+    except (ImportError, AttributeError):
+        return False
+
+
+class LatencyController:
+    def __init__(self, budget_ms=LATENCY_BUDGET_MS, levels=ADAPTIVE_SCALE_LEVELS, enabled=ADAPTIVE_SCALE_ENABLED,
+                 cooldown=ADAPTIVE_COOLDOWN_FRAMES):
+        # Orçamento de latência por frame, em segundos
+        self.budget = budget_ms / 1000
+
+        # Níveis do mais barato ao mais caro; os níveis CNN são descartados quando não há GPU
+        use_cnn = cnn_available()
+        self.levels = [DetectionSetting(*level) for level in levels if level[2] != "cnn" or use_cnn]
+
+        # Desativado: apenas o nível fixo com SCALE_FACTOR
+        self.enabled = enabled and bool(self.levels)
+        if not self.enabled:
+            self.levels = [DetectionSetting(SCALE_FACTOR, 1, "hog")]
+
+        # Nível inicial: SCALE_FACTOR com o HOG padrão, se estiver entre os níveis; senão, a escala mais próxima
+        default = DetectionSetting(SCALE_FACTOR, 1, "hog")
+        if default in self.levels:
+            self.level = self.levels.index(default)
+        else:
+            self.level = min(range(len(self.levels)), key=lambda i: abs(self.levels[i].scale - SCALE_FACTOR))
+
+        # Níveis e estado do ajuste automático, restaurados quando uma escala fixa é removida (ver set_scale)
+        self.auto_levels = self.levels
+        self.auto_enabled = self.enabled
+
+        # Frames medidos que precisam passar antes de uma nova troca de nível (evita oscilação)
+        self.cooldown = cooldown
+        self.frames_since_change = 0
+
+        # Média móvel da latência (None até a primeira medição)
+        self.latency = None
+
+    @property
+    def setting(self):
+        """
+        Configuração de detecção do nível atual.
+        """
+        return self.levels[self.level]
+
+    def observe(self, latency):
+        """
+        Registra a latência (em segundos) de um frame que passou por detecção e ajusta o nível se necessário.
+        """
+        self.latency = latency if self.latency is None else (1 - SMOOTHING) * self.latency + SMOOTHING * latency
+        self.frames_since_change += 1
+
+        if not self.enabled or self.frames_since_change < self.cooldown:
+            return
+
+        if self.latency > self.budget and self.level > 0:
+            self._change(self.level - 1)
+        elif self.latency < HEADROOM * self.budget and self.level < len(self.levels) - 1:
+            self._change(self.level + 1)
+
+    def set_scale(self, scale=None):
+        """
+        Fixa a escala da detecção (com upsample 1 e HOG), desativando o ajuste automático.
+        Com scale=None, volta aos níveis configurados e ao ajuste automático (se estiver ativo no config.py).
+        """
+        if scale is None:
+            # Retoma no nível configurado mais próximo da escala que estava fixada
+            levels, enabled = self.auto_levels, self.auto_enabled
+            level = min(range(len(levels)), key=lambda i: abs(levels[i].scale - self.setting.scale))
+        else:
+            levels, level, enabled = [DetectionSetting(scale, 1, "hog")], 0, False
+
+        # A lista e o índice são trocados antes de quem lê setting poder ver um índice fora da nova lista
+        self.enabled = False
+        self.level = min(self.level, len(levels) - 1)
+        self.levels = levels
+        self.level = level
+        self.enabled = enabled
+        self.frames_since_change = 0
+        self.latency = None
+
+    def _change(self, level):
+        """
+        Troca de nível e reinicia o período de espera e a média (as medições antigas são do nível anterior).
+        """
+        self.level = level
+        self.frames_since_change = 0
+        scale, upsample, model = self.setting
+        print(f"⚙️ Latência média {1000 * self.latency:.0f} ms (orçamento {1000 * self.budget:.0f} ms): "
+              f"detecção em escala {scale:g}, upsample {upsample}, modelo {model.upper()}.")
+        self.latency = None
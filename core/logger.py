@@ -2,38 +2,137 @@
 
 import csv                       # Biblioteca para manipulação de arquivos CSV
 import os                        # Biblioteca para interações com o sistema de arquivos (como verificar se um arquivo existe)
+import threading                 # A gravação no disco roda em uma thread própria, fora do loop de reconhecimento
+import time                      # Controle dos intervalos de gravação e de fsync
 from datetime import datetime    # Importa datetime para obter data e hora atual
 from config import LOG_FILE      # Importa o caminho do arquivo de log a partir do arquivo de configuração
                                  # (ex: "recognition_history.csv")
+from config import LOG_FLUSH_INTERVAL_SECONDS, LOG_FLUSH_BATCH_SIZE, LOG_FSYNC, LOG_FSYNC_INTERVAL_SECONDS  # Gravação em lote
 
 class Logger:
-    def __init__(self):
+    def __init__(self, path=LOG_FILE, multi_camera=False, flush_interval=LOG_FLUSH_INTERVAL_SECONDS,
+                 batch_size=LOG_FLUSH_BATCH_SIZE, fsync=LOG_FSYNC, fsync_interval=LOG_FSYNC_INTERVAL_SECONDS):
         """
         Construtor da classe Logger.
         Verifica se o arquivo de log já existe.
         Caso contrário, cria o arquivo e escreve o cabeçalho (colunas).
+        No modo com várias câmeras (multi_camera=True), o cabeçalho tem a coluna "camera".
+        Se o arquivo existente tiver outras colunas (ex: histórico gravado antes de mudar o modo), ele é renomeado
+        com a data e hora atuais e um novo arquivo é criado.
+
+        As linhas registradas por log() ficam em memória e são gravadas em lote por uma thread própria:
+        a cada flush_interval segundos ou assim que batch_size linhas se acumularem. Assim o loop de reconhecimento
+        nunca espera pelo disco (em cartões SD, cada abertura/gravação pode levar dezenas de milissegundos).
+        fsync define quando os dados são forçados para o disco: "always" (a cada lote), "interval" (no máximo a cada
+        fsync_interval segundos) ou "never" (o sistema operacional decide).
         """
-        if not os.path.exists(LOG_FILE):
+        # Colunas: data/hora, nome e, com várias câmeras, o nome da câmera
+        header = ["timestamp", "name"] + (["camera"] if multi_camera else [])
+
+        # Arquivo com outras colunas: guarda o histórico antigo com outro nome em vez de misturar os formatos
+        if os.path.exists(path):
+            with open(path, newline="") as f:
+                current = next(csv.reader(f), None)
+            if current is None:
+                os.remove(path)
+            elif current != header:
+                root, ext = os.path.splitext(path)
+                rotated = f"{root}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{ext}"
+                os.replace(path, rotated)
+                print(f"📁 Histórico com colunas {current} renomeado para '{rotated}'.")
+
+        if not os.path.exists(path):
             # Abre o arquivo no modo escrita ("w"), criando se não existir
-            with open(LOG_FILE, "w", newline="") as f:
+            with open(path, "w", newline="") as f:
                 writer = csv.writer(f)                      # Cria o escritor CSV
-                writer.writerow(["timestamp", "name"])     # Escreve o cabeçalho com as colunas: data/hora e nome
+                writer.writerow(header)                     # Escreve o cabeçalho com as colunas
+
+        # Arquivo aberto uma única vez, em modo append, e usado apenas pela thread de gravação
+        self.file = open(path, "a", newline="")
+        self.writer = csv.writer(self.file)
+
+        # Política de gravação
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.last_fsync = time.time()
 
-    def log(self, name):
+        # Indica se há linhas gravadas que ainda não passaram por fsync
+        self.unsynced = False
+
+        # Linhas aguardando gravação
+        self.rows = []
+        self.condition = threading.Condition()
+
+        # Thread de gravação (daemon: não impede o encerramento do programa; close() garante a última gravação)
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="log-historico", daemon=True)
+        self.thread.start()
+
+    def log(self, name, camera=None):
         """
         Registra uma entrada no arquivo de log.
         Cada entrada inclui o timestamp atual e o nome da pessoa reconhecida.
+        A linha entra na fila de gravação e o método retorna imediatamente (não acessa o disco).
 
         Parâmetros:
         - name: Nome da pessoa (ou "Desconhecido")
+        - camera: nome da câmera, no modo com várias câmeras (gravado em uma terceira coluna)
         """
         # Gera o timestamp atual no formato YYYY-MM-DD HH:MM:SS
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
-        # Abre o arquivo no modo append ("a") para adicionar uma nova linha
-        with open(LOG_FILE, "a", newline="") as f:
-            writer = csv.writer(f)                  # Cria o escritor CSV
-            writer.writerow([timestamp, name])      # Escreve a linha com o timestamp e o nome
+        # Adiciona a linha à fila; um lote cheio acorda a thread de gravação antes do intervalo
+        with self.condition:
+            self.rows.append([timestamp, name] + ([camera] if camera else []))
+            if len(self.rows) >= self.batch_size:
+                self.condition.notify()
 
         # Imprime no console para feedback imediato
-        print(f"✍️ {timestamp} - {name}")
+        print(f"✍️ {timestamp} - {name}{f' ({camera})' if camera else ''}")
+
+    def run(self):
+        """
+        Método executado pela thread: grava as linhas acumuladas a cada intervalo ou quando o lote enche.
+        """
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: not self.running or len(self.rows) >= self.batch_size,
+                                        self.flush_interval)
+                rows, self.rows = self.rows, []
+                running = self.running
+            self.write(rows)
+            if not running:
+                return
+
+    def write(self, rows):
+        """
+        Grava um lote de linhas no arquivo e aplica a política de fsync.
+        """
+        try:
+            if rows:
+                self.writer.writerows(rows)
+                self.file.flush()
+                self.unsynced = True
+
+            # Com "interval", o fsync também acontece sem novas linhas, assim que o intervalo passar
+            if self.unsynced and (self.fsync == "always" or (self.fsync == "interval" and
+                                                             time.time() - self.last_fsync >= self.fsync_interval)):
+                os.fsync(self.file.fileno())
+                self.last_fsync = time.time()
+                self.unsynced = False
+        except OSError as e:
+            print(f"❌ Erro ao gravar o histórico de reconhecimentos: {e}")
+
+    def close(self):
+        """
+        Grava as linhas pendentes, força a gravação no disco (exceto com fsync "never") e fecha o arquivo.
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.thread.join()
+        if self.unsynced and self.fsync != "never":
+            os.fsync(self.file.fileno())
+        self.file.close()
@@ -2,119 +2,252 @@
 
 import cv2                          # Biblioteca OpenCV para exibição de imagem e vídeo
 import time                         # Para medir tempo de execução e controlar timeout
+import argparse                     # Opções de linha de comando (ex: --headless)
+import signal                       # Encerramento limpo com SIGINT/SIGTERM (sem a tecla 'q' no modo headless)
 import json                         # Para montar mensagens em formato JSON (usado no MQTT)
+import threading                    # Evento que acorda o escalonador a cada novo frame (modo com várias câmeras)
 from datetime import datetime       # Para gerar timestamps
 
 # Módulos do sistema
 from camera import Camera                               # Captura de vídeo com threading
-from mqtt_manager import MQTTManager                    # Comunicação MQTT (publicar eventos e comandos)
+from mqtt_manager import MQTTManager, camera_topic      # Comunicação MQTT (publicar eventos e comandos)
 from face_recognition_module import FaceRecognitionModule  # Reconhecimento facial
+from gallery_watcher import GalleryWatcher              # Recarga da galeria sem reiniciar o programa
 from logger import Logger                               # Registro de eventos em CSV
 from config import *                                    # Configurações gerais do sistema (paths, limites, etc.)
-from utils import draw_face_box                         # Desenha caixa e nome sobre o rosto reconhecido
+from utils import draw_faces                            # Desenha caixa e nome sobre os rostos reconhecidos
+from debounce import FaceDebouncer, NO_FACE             # Confirmação (debounce) por rosto
+from pipeline import RecognitionPipeline                # Estágios de captura/detecção/encoding em paralelo
+from worker_pool import RecognitionWorkerPool          # Detecção/encoding em vários processos
+from multi_camera import MultiCameraPipeline, open_cameras  # Várias câmeras com um único reconhecimento
+from preview_server import PreviewServer                # Pré-visualização MJPEG pelo navegador (modo headless)
+from command_channel import CommandChannel              # Ajustes e comandos em execução recebidos por MQTT
+
+
+def sequential_results(cam, face_module):
+    """
+    Modo sem pipeline: captura e reconhece cada frame no próprio loop principal.
+    Gera pares (frame, rostos), no mesmo formato de RecognitionPipeline.results();
+    cada frame deve ser devolvido com cam.release_frame(frame) após o uso.
+    """
+    last_seq = 0
+    while True:
+        # Espera um frame mais novo que o último processado (nunca processa o mesmo frame duas vezes)
+        latest = cam.get_latest(last_seq, timeout=0.5)
+        if latest is None:
+            continue  # Nenhum frame novo ainda; tenta novamente
+        last_seq, _, frame = latest
+
+        # Reconhece todos os rostos presentes no frame
+        yield frame, face_module.recognize(frame)
+
+
+def handle_events(events, mqtt, logger, camera=None):
+    """
+    Executa as ações dos eventos do debounce de uma câmera: registro em log e publicações MQTT
+    (nos tópicos da câmera, no modo com várias câmeras).
+    """
+    for event, name in events:
+        if event == "cleared":
+            # Se antes havia um rosto confirmado, publica ausência agora
+            mqtt.publish(camera_topic(MQTT_TOPIC_STATE, camera), NO_FACE)
+            print(f"💤 Nenhum rosto detectado{f' na câmera {camera}' if camera else ''}. Atualizando estado.")
+            continue
+
+        # O nome atingiu o limiar de confirmação
+        logger.log(name, camera)  # Registra o reconhecimento
+        mqtt.publish(camera_topic(MQTT_TOPIC_STATE, camera), name)  # Publica nome reconhecido
+
+        # Instante do evento, enviado junto com o comando e o alerta (quem recebe pode descartar eventos atrasados)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+        if name != "Desconhecido":
+            # Se reconhecido, envia comando para abrir a porta
+            payload = json.dumps({"command": "open", "user": name, "timestamp": timestamp})
+            mqtt.publish(camera_topic(MQTT_TOPIC_DOOR_CONTROL, camera), payload)
+            print(f"🟢 LED ON - Porta aberta para {name}{f' ({camera})' if camera else ''}")
+        else:
+            # Caso desconhecido, envia alerta
+            alert_payload = json.dumps({
+                "message": "Rosto desconhecido detectado!",
+                "timestamp": timestamp
+            })
+            mqtt.publish(camera_topic(MQTT_TOPIC_ALERT, camera), alert_payload)
+            print(f"🔴 LED OFF - Acesso negado (Desconhecido){f' ({camera})' if camera else ''}")
+
+
+def parse_args(argv=None):
+    """
+    Lê as opções de linha de comando; os valores padrão vêm do config.py.
+    """
+    parser = argparse.ArgumentParser(description="Reconhecimento facial com integração MQTT.")
+    parser.add_argument("--headless", action="store_true", default=HEADLESS,
+                        help="executa sem janela: não desenha nem exibe os frames (encerre com Ctrl+C ou SIGTERM)")
+    parser.add_argument("--preview", action="store_true", default=PREVIEW_ENABLED,
+                        help="disponibiliza a imagem das câmeras como MJPEG em http://<host>:<porta>/")
+    parser.add_argument("--preview-host", default=PREVIEW_HOST,
+                        help="endereço do servidor de pré-visualização (use 0.0.0.0 para expor a imagem na rede)")
+    parser.add_argument("--preview-port", type=int, default=PREVIEW_PORT, help="porta do servidor de pré-visualização")
+    return parser.parse_args(argv)
+
+
+def install_signal_handlers():
+    """
+    Converte SIGINT e SIGTERM em um encerramento limpo: a exceção interrompe o loop principal e o bloco finally
+    libera câmeras, pipeline e MQTT. Sinais repetidos durante o encerramento são ignorados.
+    """
+    def handle(signum, frame):
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        print(f"🛑 Sinal {signal.Signals(signum).name} recebido. Encerrando...")
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGINT, handle)
+    signal.signal(signal.SIGTERM, handle)
+
+
+def shutdown(steps):
+    """
+    Executa as etapas do encerramento, pares (descrição, função), na ordem. Cada etapa roda mesmo que uma anterior falhe.
+    """
+    for name, step in steps:
+        try:
+            step()
+        except Exception as e:
+            print(f"❌ Erro ao encerrar {name}: {e}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    install_signal_handlers()
 
-
-def main():
     # Inicializa os módulos principais
-    cam = Camera()                       # Gerencia a câmera
-    mqtt = MQTTManager()                # Gerencia o broker MQTT
-    face_module = FaceRecognitionModule()  # Responsável pelo reconhecimento facial
-    logger = Logger()                   # Responsável por registrar logs
-
-    # Variáveis de controle do reconhecimento
-    last_name = None                    # Último nome detectado (não confirmado)
-    confirmed_name = None               # Nome confirmado após várias detecções consecutivas
-    consecutive = 0                     # Contador de confirmações consecutivas
-    last_seen = time.time()             # Timestamp da última detecção de rosto
+    # Gerencia as câmeras: uma única câmera (CAMERA_INDEX) ou, com CAMERA_SOURCES, várias câmeras nomeadas
+    if CAMERA_SOURCES:
+        frame_event = threading.Event()
+        cameras = open_cameras(CAMERA_SOURCES, frame_event)
+    else:
+        cameras = {None: Camera()}
+    mqtt = MQTTManager(list(CAMERA_SOURCES) if CAMERA_SOURCES else None)  # Gerencia o broker MQTT
+    face_module = FaceRecognitionModule()  # Responsável pelo reconhecimento facial (compartilhado por todas as câmeras)
+    logger = Logger(multi_camera=bool(CAMERA_SOURCES))  # Responsável por registrar logs (com a coluna da câmera)
+
+    # Observa a pasta de rostos conhecidos e recarrega a galeria em segundo plano
+    watcher = GalleryWatcher(face_module) if GALLERY_HOT_RELOAD else None
+
+    # Servidor de pré-visualização: só desenha e comprime frames enquanto houver um cliente conectado
+    preview = PreviewServer(list(cameras), host=args.preview_host, port=args.preview_port) if args.preview else None
+
+    # Controle de confirmação (debounce) independente para cada rosto em cena, separado por câmera
+    debouncers = {name: FaceDebouncer() for name in cameras}
+    last_seen = {name: time.time() for name in cameras}  # Timestamp da última detecção de rosto de cada câmera
+
+    # Comandos recebidos por MQTT (aplicados entre dois frames, no loop abaixo)
+    commands = CommandChannel(mqtt, face_module, debouncers) if MQTT_COMMANDS_ENABLED else None
+
+    # Com várias câmeras, um escalonador reveza as câmeras em um único pipeline. Com uma câmera: com o pool de processos,
+    # detecção e encoding rodam em vários núcleos; com o pipeline, captura, detecção e encoding rodam em estágios
+    # paralelos (threads); sem nenhum dos dois, tudo roda neste loop
+    cam = cameras.get(None)
+    if CAMERA_SOURCES:
+        pipeline = MultiCameraPipeline(cameras, face_module, frame_event)
+    elif RECOGNITION_WORKER_POOL:
+        pipeline = RecognitionWorkerPool(cam, face_module)
+    elif PIPELINE_ENABLED:
+        pipeline = RecognitionPipeline(cam, face_module)
+    else:
+        pipeline = None
+
+    if CAMERA_SOURCES:
+        results = pipeline.results()
+    else:
+        single = pipeline.results() if pipeline else sequential_results(cam, face_module)
+        results = ((None, frame, faces) for frame, faces in single)
+    last_stats = time.time()
+    frames_since_stats = 0
 
     try:
-        while True:
-            # Marca o tempo de início para cálculo de FPS
-            start_time = time.time()
-
-            # Captura o frame da câmera
-            frame = cam.get_frame()
-            if frame is None:
-                continue  # Pula iteração se o frame ainda não estiver disponível
+        # Marca o tempo de início para cálculo de FPS (de cada câmera)
+        start_time = {name: time.time() for name in cameras}
 
-            # Tenta reconhecer o rosto presente no frame
-            name, location = face_module.recognize(frame)
+        # Estágio de ações: recebe cada frame com os rostos reconhecidos (lista vazia se nenhum rosto for detectado)
+        for camera, frame, faces in results:
+            cam = cameras[camera]
+            frames_since_stats += 1
 
-            # Caso não haja rosto detectado, define como "Nenhum Rosto Detectado"
-            if not name:
-                name = "Nenhum Rosto Detectado"
+            # Aplica os comandos MQTT recebidos desde o último frame (tolerância, confirmação, escala, porta...)
+            if commands:
+                commands.apply_pending()
 
-            # Se há rosto detectado, desenha a caixa no frame
-            if name != "Nenhum Rosto Detectado":
-                frame = draw_face_box(frame, name, location)
+            # Desenha a caixa e o nome de cada rosto no frame (no modo headless, apenas se a pré-visualização pedir o frame)
+            send_preview = preview is not None and preview.wants_frame(camera)
+            if not args.headless or send_preview:
+                frame = draw_faces(frame, faces)
+            if send_preview:
+                preview.publish(frame, camera)
 
             # === Lógica de controle (debounce) ===
-            if name == "Nenhum Rosto Detectado":
-                # Se antes havia um rosto confirmado, publica ausência agora
-                if confirmed_name != "Nenhum Rosto Detectado":
-                    mqtt.publish(MQTT_TOPIC_STATE, "Nenhum Rosto Detectado")
-                    print("💤 Nenhum rosto detectado. Atualizando estado.")
-                    confirmed_name = "Nenhum Rosto Detectado"
-                    last_name = None
-                    consecutive = 0
-            else:
-                if name == confirmed_name:
-                    consecutive = 0  # Já está confirmado, nada muda
-                elif name == last_name:
-                    consecutive += 1  # Mesmo nome detectado novamente
-
-                    # Se atingiu o limiar de confirmação, confirma o nome
-                    if consecutive >= CONFIRMATION_THRESHOLD:
-                        logger.log(name)  # Registra o reconhecimento
-                        mqtt.publish(MQTT_TOPIC_STATE, name)  # Publica nome reconhecido
-
-                        if name != "Desconhecido":
-                            # Se reconhecido, envia comando para abrir a porta
-                            payload = json.dumps({"command": "open", "user": name})
-                            mqtt.publish(MQTT_TOPIC_DOOR_CONTROL, payload)
-                            print(f"🟢 LED ON - Porta aberta para {name}")
-                        else:
-                            # Caso desconhecido, envia alerta
-                            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                            alert_payload = json.dumps({
-                                "message": "Rosto desconhecido detectado!",
-                                "timestamp": timestamp
-                            })
-                            mqtt.publish(MQTT_TOPIC_ALERT, alert_payload)
-                            print("🔴 LED OFF - Acesso negado (Desconhecido)")
-
-                        confirmed_name = name
-                        consecutive = 0
-                else:
-                    # Novo nome detectado, reinicia contagem
-                    last_name = name
-                    consecutive = 1
-
-            # Atualiza o tempo do último rosto visto
-            if name != "Nenhum Rosto Detectado":
-                last_seen = time.time()
-            elif time.time() - last_seen > INACTIVITY_TIMEOUT_SECONDS and confirmed_name != "Nenhum Rosto Detectado":
-                mqtt.publish(MQTT_TOPIC_STATE, "Nenhum Rosto Detectado")
-                confirmed_name = "Nenhum Rosto Detectado"
-                print("💤 Timeout de inatividade. Estado atualizado.")
+            handle_events(debouncers[camera].update(face.name for face in faces), mqtt, logger, camera)
+
+            # Atualiza o tempo do último rosto visto (e mantém a câmera fora do modo ocioso)
+            if faces:
+                last_seen[camera] = time.time()
+                cam.notify_activity()
+            elif time.time() - last_seen[camera] > INACTIVITY_TIMEOUT_SECONDS and debouncers[camera].clear():
+                mqtt.publish(camera_topic(MQTT_TOPIC_STATE, camera), NO_FACE)
+                print(f"💤 Timeout de inatividade{f' na câmera {camera}' if camera else ''}. Estado atualizado.")
+
+            # Exibe periodicamente a profundidade das filas de cada estágio do pipeline e a economia do filtro de movimento
+            if time.time() - last_stats > PIPELINE_STATS_INTERVAL_SECONDS:
+                if pipeline:
+                    print(f"📊 Pipeline: {pipeline.stats()}")
+                print(f"📡 MQTT: {mqtt.stats()}")
+                print(f"🏃 Detecções: {face_module.detections} executadas ({face_module.cropped_detections} recortadas), "
+                      f"{face_module.skipped_detections} puladas (cena estática); "
+                      f"{frames_since_stats / (time.time() - last_stats):.1f} frames/s")
+                last_stats = time.time()
+                frames_since_stats = 0
+
+            # Modo headless: nenhuma renderização; apenas devolve o frame à câmera
+            if args.headless:
+                cam.release_frame(frame)
+                continue
 
             # === Exibição do FPS no frame ===
-            fps = 1.0 / (time.time() - start_time)
+            fps = 1.0 / max(time.time() - start_time[camera], 1e-6)
+            start_time[camera] = time.time()
             cv2.putText(frame, f"FPS: {fps:.2f}", (10, 30),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
 
-            # Exibe a imagem com OpenCV
-            cv2.imshow("Reconhecimento Facial", frame)
+            # Exibe a configuração de detecção escolhida pelo controle de latência
+            scale, upsample, model = face_module.controller.setting
+            cv2.putText(frame, f"Escala: {scale:g} ({model.upper()} x{upsample})", (10, 60),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+
+            # Exibe a imagem com OpenCV (uma janela por câmera)
+            cv2.imshow(f"Reconhecimento Facial - {camera}" if camera else "Reconhecimento Facial", frame)
+
+            # Devolve o buffer do frame à câmera para ser reutilizado na captura
+            cam.release_frame(frame)
 
             # Encerra o programa se a tecla 'q' for pressionada
             if cv2.waitKey(1) & 0xFF == ord('q'):
                 break
 
     finally:
-        # Encerra recursos mesmo se ocorrer erro ou fechamento
-        mqtt.disconnect()
-        cam.release()
-        cv2.destroyAllWindows()
+        # Encerra recursos mesmo se ocorrer erro ou fechamento. O histórico e o MQTT (fila de publicação e outbox)
+        # são gravados primeiro, para não esperarem uma recarga da galeria em andamento
+        steps = [("o histórico", logger.close), ("o MQTT", mqtt.disconnect)]
+        if pipeline:
+            steps.append(("o pipeline", pipeline.stop))
+        if watcher:
+            steps.append(("o observador da galeria", watcher.stop))
+        if preview:
+            steps.append(("a pré-visualização", preview.stop))
+        steps += [(f"a câmera{f' {name}' if name else ''}", cam.release) for name, cam in cameras.items()]
+        if not args.headless:
+            steps.append(("as janelas", cv2.destroyAllWindows))
+        shutdown(steps)
 
 # Executa o programa se este arquivo for o principal
 if __name__ == "__main__":
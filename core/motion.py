@@ -0,0 +1,76 @@
+# motion.py
+
+"""
+O arquivo motion.py define a classe MotionDetector, um pré-filtro barato de movimento: cada frame é reduzido para uma
+miniatura em tons de cinza e comparado com um fundo médio que se adapta lentamente à cena.
+Com a porta vazia (ou uma pessoa já reconhecida parada), a cena é estática e a detecção HOG pode ser pulada;
+quando há movimento, apenas a região alterada precisa ser examinada.
+"""
+
+import cv2               # Redimensionamento, conversão de cor e operações sobre a miniatura
+import numpy as np       # Usado para localizar os pixels alterados
+from config import MOTION_WIDTH, MOTION_PIXEL_THRESHOLD, MOTION_MIN_AREA, MOTION_LEARNING_RATE  # Parâmetros do filtro
+
+
+class MotionDetector:
+    def __init__(self, width=MOTION_WIDTH, pixel_threshold=MOTION_PIXEL_THRESHOLD, min_area=MOTION_MIN_AREA,
+                 learning_rate=MOTION_LEARNING_RATE):
+        # Largura da miniatura em que o movimento é medido (a altura segue a proporção do frame)
+        self.width = width
+
+        # Diferença mínima (0-255) entre um pixel e o fundo para ser considerado alterado
+        self.pixel_threshold = pixel_threshold
+
+        # Fração mínima de pixels alterados para caracterizar movimento (ignora ruído do sensor)
+        self.min_area = min_area
+
+        # Velocidade com que o fundo absorve a cena atual (objetos parados somem do movimento após ~1/taxa frames)
+        self.learning_rate = learning_rate
+
+        # Fundo médio da cena, em ponto flutuante (None até o primeiro frame)
+        self.background = None
+
+        # Contadores de frames estáticos e com movimento
+        self.static_frames = 0
+        self.moving_frames = 0
+
+    def reset(self):
+        """
+        Descarta o fundo aprendido (o próximo frame será tratado como movimento em toda a imagem).
+        """
+        self.background = None
+
+    def update(self, frame):
+        """
+        Compara o frame com o fundo e atualiza o fundo.
+
+        Retorna a caixa (top, right, bottom, left), nas coordenadas do frame, que envolve a região alterada,
+        ou None se a cena estiver estática. O primeiro frame é considerado movimento em toda a imagem.
+        """
+        frame_height, frame_width = frame.shape[:2]
+        height = max(1, round(self.width * frame_height / frame_width))
+
+        # Miniatura em tons de cinza: algumas dezenas de microssegundos, contra dezenas de milissegundos do HOG
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+        if self.background is None or self.background.shape != gray.shape:
+            self.background = gray.astype(np.float32)
+            self.moving_frames += 1
+            return (0, frame_width, frame_height, 0)
+
+        # Pixels que diferem do fundo além do limiar
+        mask = cv2.absdiff(gray, cv2.convertScaleAbs(self.background)) > self.pixel_threshold
+        cv2.accumulateWeighted(gray, self.background, self.learning_rate)
+
+        if np.count_nonzero(mask) < self.min_area * mask.size:
+            self.static_frames += 1
+            return None
+        self.moving_frames += 1
+
+        # Caixa que envolve os pixels alterados, convertida de volta para as coordenadas do frame
+        rows = np.flatnonzero(mask.any(axis=1))
+        cols = np.flatnonzero(mask.any(axis=0))
+        scale_y, scale_x = frame_height / height, frame_width / self.width
+        return (int(rows[0] * scale_y), int(np.ceil((cols[-1] + 1) * scale_x)),
+                int(np.ceil((rows[-1] + 1) * scale_y)), int(cols[0] * scale_x))
@@ -1,12 +1,19 @@
 # mqtt_manager.py
 
-import json                       # Para converter dados Python em JSON e vice-versa
+import threading                  # Estado da conexão e thread de reenvio do outbox
 import paho.mqtt.client as mqtt   # Biblioteca cliente MQTT para comunicação com broker MQTT
 from config import *              # Importa todas as configurações do arquivo config.py (ex: MQTT_USER, MQTT_PASS, tópicos, IP, porta)
+from mqtt_publisher import MQTTPublisher  # Fila de publicação em segundo plano (o loop de reconhecimento não espera a rede)
+from mqtt_outbox import MQTTOutbox        # Eventos guardados em disco enquanto o broker estiver indisponível
+from discovery import DiscoveryRegistry, camera_topic  # Payloads de discovery do Home Assistant e tópicos por câmera
+
 
 class MQTTManager:
-    def __init__(self):
-        print("🔌 Conectando ao broker MQTT...")
+    def __init__(self, cameras=None):
+        print("🔌 Conectando ao broker MQTT em segundo plano...")
+
+        # Nomes das câmeras no modo com várias câmeras (None = câmera única, com os tópicos originais)
+        self.cameras = cameras
 
         # Cria uma instância do cliente MQTT
         self.client = mqtt.Client()
@@ -14,11 +21,47 @@ class MQTTManager:
         # Configura as credenciais de usuário e senha para autenticação no broker MQTT
         self.client.username_pw_set(MQTT_USER, MQTT_PASS)
 
-        # Define a função que será chamada quando a conexão for estabelecida
+        # Define as funções que serão chamadas quando a conexão for estabelecida ou perdida
         self.client.on_connect = self.on_connect
+        self.client.on_disconnect = self.on_disconnect
+
+        # Reconexão automática com espera exponencial (de MQTT_RECONNECT_MIN_SECONDS até MQTT_RECONNECT_MAX_SECONDS)
+        self.client.reconnect_delay_set(min_delay=MQTT_RECONNECT_MIN_SECONDS, max_delay=MQTT_RECONNECT_MAX_SECONDS)
+        self.connected = threading.Event()
+
+        # Tópicos assinados (tópico -> QoS), refeitos a cada conexão; a mensagem de nascimento do Home Assistant
+        # dispara a republicação do discovery. O lock protege o dicionário, alterado pelo loop principal e lido
+        # pela thread de rede do paho
+        self.subscriptions = {}
+        self.subscriptions_lock = threading.Lock()
+        self.subscribe(MQTT_TOPIC_HA_STATUS, self.on_ha_status)
+
+        # Outbox persistente para os eventos que não podem se perder (comandos da porta e alertas) e thread de reenvio
+        cameras = cameras or [None]
+        expiring = {camera_topic(MQTT_TOPIC_DOOR_CONTROL, camera) for camera in cameras}
+        self.outbox = MQTTOutbox(expiring=expiring, max_age=MQTT_OUTBOX_DOOR_MAX_AGE_SECONDS) if MQTT_OUTBOX_FILE else None
+        self.durable = {camera_topic(topic, camera) for topic in MQTT_OUTBOX_TOPICS for camera in cameras}
+        self.replay_event = threading.Event()
+        self.stop_event = threading.Event()
+
+        # Publicação em segundo plano, com QoS e coalescência definidos por tópico (já com o nome de cada câmera);
+        # a thread de envio grava os eventos duráveis no outbox
+        self.publisher = MQTTPublisher(
+            self.client,
+            qos={camera_topic(topic, camera): qos for topic, qos in MQTT_TOPIC_QOS.items() for camera in cameras},
+            coalesced={camera_topic(topic, camera) for topic in MQTT_COALESCED_TOPICS for camera in cameras},
+            outbox=self.outbox, is_connected=self.connected.is_set, on_stored=self.replay_event.set,
+        )
+
+        # Payloads de discovery do Home Assistant, montados e serializados uma única vez
+        self.discovery = DiscoveryRegistry(self.cameras)
+        self.replay_thread = threading.Thread(target=self.replay, name="mqtt-outbox", daemon=True)
+        if self.outbox:
+            self.replay_thread.start()
 
-        # Conecta ao broker MQTT usando IP, porta e keepalive de 60 segundos
-        self.client.connect(MQTT_BROKER_IP, MQTT_PORT, 60)
+        # Conecta ao broker MQTT usando IP, porta e keepalive de 60 segundos. A conexão é feita pela thread de rede,
+        # de modo que a inicialização nunca fica bloqueada esperando o broker
+        self.client.connect_async(MQTT_BROKER_IP, MQTT_PORT, 60)
 
         # Inicia o loop de rede em uma thread separada para processar mensagens de forma assíncrona
         self.client.loop_start()
@@ -34,72 +77,121 @@ class MQTTManager:
         """
         if rc == 0:
             print("✅ Conectado ao broker MQTT.")
-            # Publica mensagens de descoberta para integração com Home Assistant
+            self.connected.set()
+            # Refaz as inscrições (ex: mensagem de nascimento do Home Assistant e canal de comandos)
+            with self.subscriptions_lock:
+                subscriptions = list(self.subscriptions.items())
+            for topic, qos in subscriptions:
+                self.client.subscribe(topic, qos=qos)
+            # Publica mensagens de descoberta para integração com Home Assistant (apenas as que mudaram)
             self.publish_discovery()
+            # Reenvia os eventos do outbox ainda não entregues ao paho (os entregues e não confirmados antes da queda
+            # são reenviados pelo próprio paho)
+            self.replay_event.set()
         else:
             print(f"❌ Falha na conexão MQTT. Código: {rc}")
 
-    def publish_discovery(self):
+    def subscribe(self, topic, callback, qos=1):
+        """
+        Assina um tópico; callback(client, userdata, message) é chamado pela thread de rede do paho a cada mensagem.
+        A inscrição é refeita automaticamente após cada reconexão.
+        """
+        with self.subscriptions_lock:
+            self.subscriptions[topic] = qos
+        self.client.message_callback_add(topic, callback)
+        if self.connected.is_set():
+            self.client.subscribe(topic, qos=qos)
+
+    def on_disconnect(self, client, userdata, rc):
+        """
+        Callback executado quando a conexão com o broker é perdida (rc != 0) ou encerrada (rc = 0).
+        A reconexão é feita automaticamente pelo loop de rede do paho.
+        """
+        self.connected.clear()
+        if rc != 0:
+            print(f"⚠️ Conexão MQTT perdida (código {rc}). Tentando reconectar...")
+
+    def on_ha_status(self, client, userdata, message):
+        """
+        Callback da mensagem de nascimento do Home Assistant: ao reiniciar, ele publica "online" em MQTT_TOPIC_HA_STATUS
+        e precisa receber todas as configurações de discovery novamente.
+        """
+        if message.payload.decode(errors="ignore") == "online":
+            print("🏠 Home Assistant reiniciado. Republicando discovery...")
+            self.publish_discovery(force=True)
+
+    def publish_discovery(self, force=False):
         """
         Publica mensagens MQTT de descoberta (discovery) para o Home Assistant.
         Essas mensagens permitem que o Home Assistant detecte automaticamente os sensores e comandos.
+        Apenas os payloads que mudaram desde a última publicação confirmada são enviados (todos, com force=True).
         """
+        for topic, payload in self.discovery.pending(force):
+            self.publish(topic, payload, retain=True, qos=1,
+                         on_delivered=lambda topic=topic: self.discovery.mark_published(topic))
 
-        # Publica a configuração do sensor do último rosto reconhecido
-        self.publish(MQTT_TOPIC_DISCOVERY, json.dumps({
-            "name": "Último Rosto Reconhecido",
-            "state_topic": MQTT_TOPIC_STATE,
-            "unique_id": "face_recognition_cam_status",
-            "icon": "mdi:face-recognition",
-            "device": {
-                "identifiers": ["facial_recognition_cam_01"],
-                "name": "Câmera de Reconhecimento Facial",
-                "model": "PC Webcam",
-                "manufacturer": "DIY"
-            }
-        }), retain=True)
-
-        # Publica a configuração do sensor/status do comando da porta
-        self.publish(MQTT_TOPIC_DOOR_DISCOVERY, json.dumps({
-            "name": "Status da Porta",
-            "state_topic": MQTT_TOPIC_DOOR_CONTROL,
-            "unique_id": "face_recognition_cam_door_command",
-            "value_template": "{% if value_json.command == 'open' %}Aberta{% else %}Fechada{% endif %}",
-            "icon": "mdi:door",
-            "json_attributes_topic": MQTT_TOPIC_DOOR_CONTROL,
-            "device": {
-                "identifiers": ["facial_recognition_cam_01"]
-            }
-        }), retain=True)
-
-        # Publica a configuração do sensor para alertas de rostos desconhecidos
-        self.publish(MQTT_TOPIC_ALERT_DISCOVERY, json.dumps({
-            "name": "Alerta Rosto Desconhecido",
-            "state_topic": MQTT_TOPIC_ALERT,
-            "unique_id": "face_recognition_cam_unknown_alert",
-            "value_template": "{{ value_json.message }}",
-            "json_attributes_topic": MQTT_TOPIC_ALERT,
-            "icon": "mdi:alert",
-            "device": {
-                "identifiers": ["facial_recognition_cam_01"]
-            }
-        }), retain=True)
-
-    def publish(self, topic, payload, retain=False):
-        """
-        Publica uma mensagem no broker MQTT.
+    def publish(self, topic, payload, retain=False, qos=None, on_delivered=None):
+        """
+        Publica uma mensagem no broker MQTT. A mensagem entra na fila de publicação e o método retorna
+        imediatamente; o envio (e a gravação no outbox dos eventos duráveis) é feito em segundo plano
+        (ver mqtt_publisher.py).
 
         Parâmetros:
         - topic: tópico MQTT onde a mensagem será publicada
         - payload: conteúdo da mensagem (string, geralmente JSON)
         - retain: se True, a mensagem fica retida no broker para novos assinantes
+        - qos: nível de QoS (None = o definido para o tópico em MQTT_TOPIC_QOS, ou MQTT_DEFAULT_QOS)
+        - on_delivered: função chamada quando o broker confirmar a mensagem (opcional)
+        """
+        durable = self.outbox is not None and topic in self.durable
+        if durable:
+            # Eventos que não podem se perder usam QoS 1 ou maior (confirmação do broker)
+            qos = max(1, self.publisher.qos.get(topic, MQTT_DEFAULT_QOS) if qos is None else qos)
+
+        self.publisher.publish(topic, payload, retain=retain, qos=qos, on_delivered=on_delivered, durable=durable)
+
+    def replay(self):
+        """
+        Método executado pela thread de reenvio: com o broker conectado, envia os eventos do outbox ainda não
+        entregues ao paho, na ordem em que foram gravados, no máximo MQTT_OUTBOX_REPLAY_RATE por segundo.
+        Cada evento fica reservado até o paho confirmar o seu mid, quando é apagado do outbox.
         """
-        self.client.publish(topic, payload, retain=retain)
+        interval = 1.0 / MQTT_OUTBOX_REPLAY_RATE
+        while True:
+            self.replay_event.wait()
+            self.replay_event.clear()
+            if self.stop_event.is_set():
+                return
+
+            while self.connected.is_set() and not self.stop_event.is_set():
+                event = self.outbox.claim()
+                if event is None:
+                    break
+                event_id, topic, payload, qos, retain = event
+                self.publisher.publish(topic, payload, retain=retain, qos=qos, event_id=event_id)
+                self.stop_event.wait(interval)
+
+    def stats(self):
+        """
+        Retorna as estatísticas da fila de publicação (tamanho, mensagens em voo, latência e descartes)
+        e a quantidade de eventos aguardando no outbox.
+        """
+        stats = self.publisher.stats()
+        if self.outbox:
+            stats["outbox"] = self.outbox.count()
+        return stats
 
     def disconnect(self):
         """
-        Desconecta o cliente MQTT e para o loop de rede.
+        Entrega as mensagens pendentes (por até MQTT_PUBLISH_FLUSH_SECONDS), desconecta o cliente MQTT e para o loop de rede.
         """
-        self.client.loop_stop()
+        self.stop_event.set()
+        self.replay_event.set()
+        if self.outbox:
+            self.replay_thread.join()
+        self.publisher.stop()
         self.client.disconnect()
+        self.client.loop_stop()
+        if self.outbox:
+            self.outbox.close()
         print("✅ Cliente MQTT desconectado.")
@@ -0,0 +1,142 @@
+# mqtt_outbox.py
+
+"""
+O arquivo mqtt_outbox.py define a classe MQTTOutbox, uma caixa de saída persistente (SQLite em modo WAL) para os
+eventos que não podem se perder: comandos da porta e alertas de rosto desconhecido.
+Cada evento é gravado aqui pela thread de publicação (nunca pelo loop de reconhecimento) e só é apagado quando o paho
+confirma o seu mid. Enquanto o broker estiver indisponível, os eventos ficam guardados; após a reconexão, o MQTTManager
+reenvia na ordem original, e em ritmo limitado, os que ainda não foram entregues ao paho.
+Um evento entregue ao paho fica "reservado" (claim) até a confirmação: o próprio paho o reenvia após uma reconexão,
+então ele não é reenviado de novo (a porta não abre duas vezes). As reservas ficam só em memória: após um reinício
+(ex: queda de energia), todos os eventos do arquivo voltam a ser reenviados, exceto os comandos da porta mais antigos
+que MQTT_OUTBOX_DOOR_MAX_AGE_SECONDS, que são descartados.
+"""
+
+import sqlite3      # Banco local (um único arquivo) com escrita atômica
+import threading    # O outbox é usado pela thread de publicação, pela thread de reenvio e pelo callback do paho
+import time         # Data de criação de cada evento
+from config import MQTT_OUTBOX_FILE, MQTT_OUTBOX_MAX_EVENTS  # Arquivo do outbox e quantidade máxima de eventos guardados
+
+
+class MQTTOutbox:
+    def __init__(self, path=MQTT_OUTBOX_FILE, max_events=MQTT_OUTBOX_MAX_EVENTS, expiring=(), max_age=None):
+        # Quantidade máxima de eventos guardados (os mais antigos são descartados primeiro)
+        self.max_events = max_events
+
+        # Tópicos cujos eventos perdem o sentido depois de max_age segundos (ex: abrir a porta horas depois do
+        # reconhecimento); esses eventos são apagados em vez de reenviados
+        self.expiring = set(expiring)
+        self.max_age = max_age
+
+        # Conexão única protegida por lock (compartilhada entre as threads)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+
+        # WAL: gravações pequenas e sequenciais, sem bloquear leituras; NORMAL basta para não corromper o arquivo
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                topic TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                qos INTEGER NOT NULL,
+                retain INTEGER NOT NULL,
+                created REAL NOT NULL
+            )
+        """)
+
+        # Quantidade de eventos descartados por excesso (o outbox não cresce sem limite) e por idade
+        self.dropped = 0
+        self.expired = 0
+
+        # Quantidade de eventos no arquivo e ids dos eventos entregues ao paho aguardando confirmação (em memória:
+        # consultados a cada evento publicado, sem acessar o banco)
+        self.size = self.db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+        self.claimed = set()
+
+        pending = self.count()
+        if pending:
+            print(f"📦 {pending} evento(s) MQTT pendente(s) no outbox serão reenviados após a conexão.")
+
+    def add(self, topic, payload, qos, retain, claimed=False):
+        """
+        Grava um evento no fim do outbox, descartando os mais antigos se o limite for ultrapassado, e retorna o seu id.
+        Com claimed=True, o evento já sai reservado (será entregue ao paho em seguida por quem o gravou).
+        """
+        with self.lock:
+            event_id = self.db.execute("INSERT INTO outbox (topic, payload, qos, retain, created) VALUES (?, ?, ?, ?, ?)",
+                                       (topic, payload, qos, int(retain), time.time())).lastrowid
+            self.size += 1
+            if claimed:
+                self.claimed.add(event_id)
+
+            excess = self.size - self.max_events
+            if excess > 0:
+                oldest = [row[0] for row in self.db.execute("SELECT id FROM outbox ORDER BY id LIMIT ?", (excess,))]
+                self.db.execute("DELETE FROM outbox WHERE id <= ?", (oldest[-1],))
+                self.claimed.difference_update(oldest)
+                self.size -= len(oldest)
+                self.dropped += len(oldest)
+        return event_id
+
+    def claim(self):
+        """
+        Reserva o evento mais antigo ainda não entregue ao paho e o retorna como (id, tópico, payload, qos, retain),
+        ou None se não houver nenhum. Eventos expirados encontrados no caminho são apagados.
+        """
+        with self.lock:
+            while True:
+                # Os eventos reservados estão entre os mais antigos: basta ler um a mais que a quantidade de reservas
+                rows = self.db.execute("SELECT id, topic, payload, qos, retain, created FROM outbox ORDER BY id LIMIT ?",
+                                       (len(self.claimed) + 1,)).fetchall()
+                for event_id, topic, payload, qos, retain, created in rows:
+                    if event_id in self.claimed:
+                        continue
+                    if topic in self.expiring and time.time() - created > self.max_age:
+                        self.db.execute("DELETE FROM outbox WHERE id = ?", (event_id,))
+                        self.size -= 1
+                        self.expired += 1
+                        print(f"⌛ Evento MQTT de '{topic}' descartado do outbox: gravado há {time.time() - created:.0f}s.")
+                        break
+                    self.claimed.add(event_id)
+                    return event_id, topic, payload, qos, bool(retain)
+                else:
+                    return None
+
+    def release(self, event_id):
+        """
+        Desfaz a reserva de um evento que não chegou ao paho (ele volta a ser reenviado).
+        """
+        with self.lock:
+            self.claimed.discard(event_id)
+
+    def remove(self, event_id):
+        """
+        Apaga um evento já confirmado pelo broker.
+        """
+        with self.lock:
+            if self.db.execute("DELETE FROM outbox WHERE id = ?", (event_id,)).rowcount:
+                self.size -= 1
+            self.claimed.discard(event_id)
+
+    def count(self):
+        """
+        Retorna a quantidade de eventos guardados (reservados ou não), sem acessar o banco.
+        """
+        with self.lock:
+            return self.size
+
+    def backlog(self):
+        """
+        Retorna a quantidade de eventos ainda não entregues ao paho, sem acessar o banco.
+        """
+        with self.lock:
+            return self.size - len(self.claimed)
+
+    def close(self):
+        """
+        Fecha o banco (os eventos pendentes continuam no arquivo para a próxima execução).
+        """
+        with self.lock:
+            self.db.close()
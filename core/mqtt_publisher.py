@@ -0,0 +1,269 @@
+# mqtt_publisher.py
+
+"""
+O arquivo mqtt_publisher.py define a classe MQTTPublisher, que tira a publicação MQTT do loop de reconhecimento:
+publish() apenas coloca a mensagem em uma fila limitada e retorna, e uma thread própria entrega as mensagens
+ao cliente paho em lotes. Assim um broker lento ou instável não atrasa os frames.
+
+- Tópicos de estado (ex: MQTT_TOPIC_STATE) são coalescidos: se ainda houver um valor na fila, ele é substituído
+  pelo mais novo, pois só o último estado importa.
+- Com a fila cheia, descarta-se (e conta-se) a mensagem QoS 0 mais antiga, depois o valor de estado mais antigo,
+  em vez de bloquear quem publica. Mensagens QoS 1/2 (porta, alertas) nunca são descartadas nem esperam: se não houver
+  o que descartar, entram acima do limite (contadas em "excedentes"). publish() nunca bloqueia o loop de reconhecimento.
+- O QoS é definido por tópico, e as mensagens em voo (entregues ao paho e ainda não confirmadas) são limitadas.
+- Mensagens duráveis (comandos da porta, alertas) são gravadas no outbox pela thread de envio antes de chegarem ao paho
+  e apagadas quando o paho confirma o mid. Sem conexão, ou com eventos mais antigos ainda no outbox, elas apenas ficam
+  gravadas, e o MQTTManager as reenvia em ordem após a reconexão (ver mqtt_outbox.py).
+- stats() expõe o tamanho da fila, as mensagens em voo, a latência média e os contadores de descarte.
+"""
+
+import threading                  # A entrega ao broker roda em uma thread própria
+import time                       # Usado para medir a latência de cada mensagem
+from collections import deque     # Fila de mensagens pendentes (descarte eficiente da mais antiga)
+import paho.mqtt.client as mqtt   # Códigos de retorno do cliente MQTT
+from config import MQTT_PUBLISH_QUEUE_SIZE, MQTT_MAX_INFLIGHT, MQTT_DEFAULT_QOS, MQTT_PUBLISH_FLUSH_SECONDS  # Parâmetros
+
+# Peso de cada nova medida na média móvel da latência de publicação
+LATENCY_SMOOTHING = 0.1
+
+
+class MQTTPublisher:
+    def __init__(self, client, qos=None, coalesced=(), max_size=MQTT_PUBLISH_QUEUE_SIZE, max_inflight=MQTT_MAX_INFLIGHT,
+                 outbox=None, is_connected=None, on_stored=None):
+        # Cliente paho já configurado (a conexão e o loop de rede são responsabilidade do MQTTManager)
+        self.client = client
+        self.client.on_publish = self.on_publish
+
+        # Outbox das mensagens duráveis (opcional), estado da conexão e aviso de evento gravado para reenvio posterior
+        self.outbox = outbox
+        self.is_connected = is_connected
+        self.on_stored = on_stored
+
+        # QoS de cada tópico (os demais usam MQTT_DEFAULT_QOS) e tópicos em que só o último valor importa
+        self.qos = dict(qos or {})
+        self.coalesced = set(coalesced)
+
+        # Fila de mensagens [tópico, payload, retain, qos, instante, on_delivered, durável, id no outbox]
+        # e mensagem pendente de cada tópico coalescido
+        self.queue = deque()
+        self.latest = {}
+        self.max_size = max_size
+        self.condition = threading.Condition()
+
+        # Mensagens entregues ao paho aguardando confirmação: mid -> (instante em que entraram na fila, on_delivered, id no outbox)
+        self.inflight = {}
+        self.max_inflight = max_inflight
+
+        # Confirmações que chegaram antes de publish() retornar o mid (o paho pode confirmar QoS 0 imediatamente)
+        self.early_acks = set()
+
+        # Contadores e latência média (da fila até a confirmação do paho), em segundos
+        self.sent = 0
+        self.coalesced_count = 0
+        self.dropped = 0
+        self.overflow = 0
+        self.skipped = 0
+        self.errors = 0
+        self.latency = 0.0
+
+        # Thread de envio (daemon: não impede o encerramento do programa)
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="mqtt-publicacao", daemon=True)
+        self.thread.start()
+
+    def publish(self, topic, payload, retain=False, qos=None, on_delivered=None, durable=False, event_id=None):
+        """
+        Coloca a mensagem na fila de envio e retorna imediatamente (nunca espera pela rede nem pelo disco).
+        Em tópicos coalescidos, substitui o valor que ainda estiver na fila.
+        on_delivered, se informado, é chamado sem argumentos quando o paho confirmar a mensagem.
+        durable=True grava a mensagem no outbox antes do envio; event_id identifica um evento já gravado e reservado
+        no outbox (reenvio), apagado quando o paho confirmar a mensagem.
+        """
+        qos = self.qos.get(topic, MQTT_DEFAULT_QOS) if qos is None else qos
+        with self.condition:
+            pending = self.latest.get(topic)
+            if pending is not None:
+                # Mantém a posição na fila, mas com o valor mais novo
+                pending[1], pending[2] = payload, retain
+                self.coalesced_count += 1
+                return
+
+            # Fila cheia: abre espaço descartando uma mensagem menos importante
+            if len(self.queue) >= self.max_size and not self._drop_one(qos):
+                if qos == 0:
+                    # Só há mensagens QoS 1/2 na fila: a nova mensagem QoS 0 é a descartada
+                    self.dropped += 1
+                    return
+
+                # Mensagem QoS 1/2 nunca é descartada: entra acima do limite, sem esperar a thread de envio
+                # (a gravação no outbox, se for durável, é feita pela thread de envio)
+                self.overflow += 1
+
+            message = [topic, payload, retain, qos, time.time(), on_delivered, durable, event_id]
+            self.queue.append(message)
+            if topic in self.coalesced:
+                self.latest[topic] = message
+            self.condition.notify_all()
+
+    def _drop_one(self, qos):
+        """
+        Descarta a mensagem QoS 0 mais antiga que não seja de estado ou, na falta dela, o valor de estado mais antigo
+        (só é trocado por uma mensagem QoS 1/2: entre estados, o coalescimento já limita a fila).
+        Retorna False se não houver mensagem descartável (chamado com o lock adquirido).
+        """
+        victim = next((m for m in self.queue if m[3] == 0 and m[0] not in self.coalesced), None)
+        if victim is None and qos > 0:
+            victim = next((m for m in self.queue if m[0] in self.coalesced), None)
+        if victim is None:
+            return False
+        self.queue.remove(victim)
+        self._forget(victim)
+        self.dropped += 1
+        return True
+
+    def _forget(self, message):
+        """
+        Remove a mensagem do registro de valores coalescidos (chamado quando ela sai da fila).
+        """
+        if self.latest.get(message[0]) is message:
+            del self.latest[message[0]]
+
+    def run(self):
+        """
+        Método executado pela thread: retira da fila todas as mensagens que cabem no limite de mensagens em voo
+        e as entrega ao paho em lote, fora do lock (a fila continua recebendo mensagens enquanto isso).
+        """
+        while True:
+            with self.condition:
+                self.condition.wait_for(
+                    lambda: not self.running or (self.queue and len(self.inflight) < self.max_inflight), timeout=1.0)
+                if not self.running:
+                    return
+                batch = []
+                while self.queue and len(self.inflight) + len(batch) < self.max_inflight:
+                    message = self.queue.popleft()
+                    self._forget(message)
+                    batch.append(message)
+
+            for topic, payload, retain, qos, queued_at, on_delivered, durable, event_id in batch:
+                self._send(topic, payload, retain, qos, queued_at, on_delivered, durable, event_id)
+
+    def _store(self, topic, payload, retain, qos, durable, event_id):
+        """
+        Grava no outbox uma mensagem durável antes do envio. Retorna o id do evento, reservado para ser entregue ao
+        paho agora, ou None quando a mensagem deve apenas ficar gravada: sem conexão, ou com eventos mais antigos ainda
+        não enviados (a ordem original é mantida pelo reenvio do MQTTManager).
+        """
+        if not durable or self.outbox is None or event_id is not None:
+            return event_id
+        if not self.is_connected() or self.outbox.backlog():
+            self.outbox.add(topic, payload, qos, retain)
+            self.on_stored()
+            return None
+        return self.outbox.add(topic, payload, qos, retain, claimed=True)
+
+    def _send(self, topic, payload, retain, qos, queued_at, on_delivered, durable, event_id):
+        """
+        Entrega uma mensagem ao paho e registra o mid para medir a latência quando a confirmação chegar.
+        """
+        try:
+            event_id = self._store(topic, payload, retain, qos, durable, event_id)
+            if durable and event_id is None:
+                return
+        except Exception as e:
+            # Sem o outbox, a mensagem ainda é enviada (apenas não sobrevive a um reinício)
+            print(f"❌ Erro ao gravar no outbox a mensagem do tópico '{topic}': {e}")
+
+        try:
+            info = self.client.publish(topic, payload, qos=qos, retain=retain)
+        except Exception as e:
+            self.errors += 1
+            print(f"❌ Erro ao publicar no tópico '{topic}': {e}")
+            self._release(event_id)
+            return
+
+        with self.condition:
+            # QoS 0 sem conexão é ignorado pelo paho (não é um erro); QoS 1/2 fica na fila do paho até a reconexão
+            if info.rc != mqtt.MQTT_ERR_SUCCESS and qos == 0:
+                self.skipped += 1
+                return
+            # QoS 1/2 recusado pelo paho (ex: fila interna cheia): o evento volta a ser reenviado pelo outbox
+            if info.rc not in (mqtt.MQTT_ERR_SUCCESS, mqtt.MQTT_ERR_NO_CONN):
+                self.errors += 1
+                self._release(event_id)
+                return
+            if info.mid not in self.early_acks:
+                self.inflight[info.mid] = (queued_at, on_delivered, event_id)
+                self.condition.notify_all()
+                return
+            self.early_acks.discard(info.mid)
+            self._acknowledged(queued_at)
+            self.condition.notify_all()
+        self._delivered(on_delivered, event_id)
+
+    def _release(self, event_id):
+        """
+        Desfaz a reserva no outbox de um evento que não chegou ao paho.
+        """
+        if event_id is not None:
+            self.outbox.release(event_id)
+            self.on_stored()
+
+    def _delivered(self, on_delivered, event_id):
+        """
+        Apaga do outbox a mensagem confirmada pelo paho e chama on_delivered.
+        """
+        if event_id is not None:
+            self.outbox.remove(event_id)
+        if on_delivered:
+            on_delivered()
+
+    def on_publish(self, client, userdata, mid):
+        """
+        Callback do paho: a mensagem foi enviada (QoS 0) ou confirmada pelo broker (QoS 1/2).
+        """
+        with self.condition:
+            entry = self.inflight.pop(mid, None)
+            if entry is None:
+                self.early_acks.add(mid)
+                return
+            queued_at, on_delivered, event_id = entry
+            self._acknowledged(queued_at)
+            self.condition.notify_all()
+
+        # Fora do lock: apagar a mensagem do outbox acessa o disco
+        self._delivered(on_delivered, event_id)
+
+    def _acknowledged(self, queued_at):
+        """
+        Atualiza o contador de mensagens enviadas e a média da latência (chamado com o lock adquirido).
+        """
+        latency = time.time() - queued_at
+        self.latency = latency if not self.sent else (1 - LATENCY_SMOOTHING) * self.latency + LATENCY_SMOOTHING * latency
+        self.sent += 1
+
+    def stats(self):
+        """
+        Retorna o estado da publicação: tamanho da fila, mensagens em voo, latência média e contadores.
+        """
+        with self.condition:
+            return {"fila": len(self.queue), "em_voo": len(self.inflight), "enviadas": self.sent,
+                    "coalescidas": self.coalesced_count, "descartadas": self.dropped, "excedentes": self.overflow,
+                    "ignoradas_sem_conexao": self.skipped, "erros": self.errors,
+                    "latencia_ms": 1000 * self.latency}
+
+    def stop(self, timeout=MQTT_PUBLISH_FLUSH_SECONDS):
+        """
+        Espera (até timeout segundos) a fila e as mensagens em voo serem entregues e encerra a thread de envio.
+        As mensagens duráveis que ainda estiverem na fila são gravadas no outbox, para serem reenviadas na próxima execução.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: not self.queue and not self.inflight, timeout)
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join()
+
+        if self.outbox is not None:
+            for topic, payload, retain, qos, queued_at, on_delivered, durable, event_id in self.queue:
+                if durable and event_id is None:
+                    self.outbox.add(topic, payload, qos, retain)
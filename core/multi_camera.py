@@ -0,0 +1,153 @@
+# multi_camera.py
+
+"""
+O arquivo multi_camera.py define a classe MultiCameraPipeline, o modo com várias câmeras (porta da frente, garagem,
+portão...) em um único processo: todas alimentam o mesmo FaceRecognitionModule, de modo que a galeria e os modelos
+do dlib são carregados uma única vez.
+Um escalonador round-robin pega no máximo um frame de cada câmera por rodada, para que uma câmera com taxa alta não
+monopolize o reconhecimento. O estado que depende da ordem dos frames (rastros, movimento, ROI) é mantido por câmera
+no FaceRecognitionModule, e o debounce e os tópicos MQTT são separados por câmera no main.py.
+"""
+
+import queue             # Filas limitadas entre os estágios
+import threading         # Escalonador e estágios rodam em threads
+from camera import Camera                   # Captura de cada câmera
+from config import PIPELINE_QUEUE_SIZE      # Tamanho máximo de cada fila entre estágios (definido no config.py)
+from pipeline import Stage, BatchStage, STOP, stage_stats  # Estágios de detecção e encoding (os mesmos do pipeline de uma câmera)
+
+
+def open_cameras(sources, frame_event):
+    """
+    Abre as câmeras configuradas (nome -> índice do dispositivo ou URL), todas sinalizando frame_event a cada frame.
+    Se alguma câmera não abrir, as já abertas são liberadas antes do erro ser propagado.
+    """
+    cameras = {}
+    try:
+        for name, source in sources.items():
+            cameras[name] = Camera(source, name=name, frame_event=frame_event)
+    except Exception:
+        for camera in cameras.values():
+            camera.release()
+        raise
+    return cameras
+
+
+class MultiCameraPipeline:
+    def __init__(self, cameras, face_module, frame_event, queue_size=PIPELINE_QUEUE_SIZE):
+        # Câmeras (nome -> Camera), módulo de reconhecimento compartilhado e evento sinalizado a cada novo frame
+        self.cameras = cameras
+        self.face_module = face_module
+        self.frame_event = frame_event
+
+        # Filas limitadas entre os estágios; cada item é ((nome da câmera, frame), dado)
+        self.detect_queue = queue.Queue(maxsize=queue_size)
+        self.identify_queue = queue.Queue(maxsize=queue_size)
+        self.results_queue = queue.Queue(maxsize=queue_size)
+
+        # Contadores por câmera: frames enviados ao reconhecimento, descartados com a detecção ocupada
+        # e frames que a câmera produziu mas não foram lidos
+        self.scheduled = {name: 0 for name in cameras}
+        self.dropped = {name: 0 for name in cameras}
+        self.skipped = {name: 0 for name in cameras}
+
+        self.running = True
+
+        # Estágios de processamento compartilhados por todas as câmeras (um worker cada, para manter a ordem por câmera)
+        self.stages = [
+            Stage("detecção", lambda item, _: face_module.detect(item[1], stream=item[0]),
+                  self.detect_queue, self.identify_queue, self.release),
+            BatchStage("encoding", lambda batch: face_module.identify_batch([detection for _, detection in batch]),
+                       self.identify_queue, self.results_queue, self.release),
+        ]
+
+        # Escalonador: distribui a capacidade de reconhecimento entre as câmeras
+        self.scheduler_thread = threading.Thread(target=self.schedule, name="multicam-escalonador", daemon=True)
+
+        for stage in self.stages:
+            stage.thread.start()
+        self.scheduler_thread.start()
+
+    def release(self, item):
+        """
+        Devolve o frame de um item (nome da câmera, frame) à câmera de origem.
+        """
+        name, frame = item
+        self.cameras[name].release_frame(frame)
+
+    def schedule(self):
+        """
+        Escalonador round-robin: a cada rodada, envia o frame mais recente de cada câmera que tenha um frame novo.
+        A rodada seguinte começa pela câmera seguinte, e sem nenhum frame novo o escalonador dorme até a próxima captura.
+        Se a fila de detecção estiver cheia, o frame é descartado, como no pipeline de uma câmera: uma detecção lenta
+        não trava as demais câmeras nem acumula frames antigos.
+        """
+        names = list(self.cameras)
+        last_seq = {name: 0 for name in names}
+        start = 0
+        while self.running:
+            # Limpa o evento antes de consultar as câmeras, para não perder um frame que chegue durante a rodada
+            self.frame_event.clear()
+            sent = False
+            for name in names[start:] + names[:start]:
+                latest = self.cameras[name].get_latest(last_seq[name], timeout=0)
+                if latest is None:
+                    continue
+                seq, _, frame = latest
+                if last_seq[name]:
+                    self.skipped[name] += seq - last_seq[name] - 1
+                last_seq[name] = seq
+
+                try:
+                    self.detect_queue.put_nowait(((name, frame), None))
+                except queue.Full:
+                    self.dropped[name] += 1
+                    self.cameras[name].release_frame(frame)
+                    continue
+                self.scheduled[name] += 1
+                sent = True
+                if not self.running:
+                    break
+            start = (start + 1) % len(names)
+
+            if not sent:
+                self.frame_event.wait(0.5)
+
+        self.detect_queue.put(STOP)
+
+    def results(self):
+        """
+        Gera as tuplas (nome da câmera, frame, rostos), na ordem de captura de cada câmera.
+        Quem consome deve devolver cada frame com cameras[nome].release_frame(frame) ao terminar.
+        """
+        while True:
+            item = self.results_queue.get()
+            if item is STOP:
+                return
+            (name, frame), faces = item
+            yield name, frame, faces
+
+    def stats(self):
+        """
+        Retorna as estatísticas por câmera (frames enviados, descartados e pulados) e de cada estágio compartilhado.
+        """
+        stats = {name: {"enviados": self.scheduled[name], "descartados": self.dropped[name], "pulados": self.skipped[name]}
+                 for name in self.cameras}
+        stats.update(stage_stats(self.stages))
+        stats["ações"] = {"fila": self.results_queue.qsize()}
+        return stats
+
+    def stop(self):
+        """
+        Encerra o escalonador e propaga o sinal de parada por todos os estágios.
+        """
+        self.running = False
+        self.frame_event.set()
+
+        # Esvazia a fila de resultados até todas as threads terminarem, para que nenhuma fique bloqueada em put()
+        while self.scheduler_thread.is_alive() or any(stage.thread.is_alive() for stage in self.stages):
+            try:
+                item = self.results_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is not STOP:
+                self.release(item[0])
@@ -0,0 +1,236 @@
+# pipeline.py
+
+"""
+O arquivo pipeline.py define a classe RecognitionPipeline, que divide o reconhecimento em estágios executados em threads
+separadas e ligados por filas limitadas: captura → detecção → encoding/comparação → ações (log, MQTT e desenho, no main.py).
+Enquanto o frame t está sendo codificado, o frame t+1 já está sendo detectado, de modo que a vazão se aproxima
+da do estágio mais lento, e não da soma de todos os estágios.
+"""
+
+import queue             # Filas limitadas entre os estágios
+import threading         # Cada estágio roda na sua própria thread
+import time              # Usado para medir o tempo gasto em cada estágio
+from config import PIPELINE_QUEUE_SIZE, ENCODING_BATCH_SIZE, ENCODING_BATCH_MAX_WAIT_MS  # Parâmetros do pipeline
+
+# Marcador que sinaliza o fim do fluxo para os estágios seguintes
+STOP = object()
+
+
+def stage_stats(stages):
+    """
+    Estatísticas de cada estágio: profundidade da fila de entrada, itens processados, tempo médio (ms) e, nos estágios
+    em lote, o tamanho médio do lote. Usado por RecognitionPipeline e MultiCameraPipeline.
+    """
+    stats = {}
+    for stage in stages:
+        stats[stage.name] = {
+            "fila": stage.input_queue.qsize(),
+            "processados": stage.processed,
+            "ms": 1000 * stage.busy_seconds / stage.processed if stage.processed else 0.0,
+        }
+        if isinstance(stage, BatchStage):
+            stats[stage.name]["lote"] = stage.processed / stage.batches if stage.batches else 0.0
+    return stats
+
+
+class Stage:
+    def __init__(self, name, func, input_queue, output_queue, on_drop):
+        # Nome do estágio (usado nas estatísticas)
+        self.name = name
+
+        # Função aplicada a cada item: recebe (frame, dado) e devolve o novo dado
+        self.func = func
+
+        # Filas de entrada e de saída do estágio
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+
+        # Função chamada com o frame descartado após um erro (devolve o buffer à câmera)
+        self.on_drop = on_drop
+
+        # Contadores de itens processados e tempo total de processamento
+        self.processed = 0
+        self.busy_seconds = 0.0
+
+        # Thread do estágio (daemon: não impede o encerramento do programa)
+        self.thread = threading.Thread(target=self.run, name=f"pipeline-{name}", daemon=True)
+
+    def run(self):
+        """
+        Consome itens da fila de entrada, processa e envia para a fila de saída, na mesma ordem em que chegaram.
+        """
+        while True:
+            item = self.input_queue.get()
+            if item is STOP:
+                self.output_queue.put(STOP)
+                return
+
+            frame, data = item
+            start = time.time()
+            try:
+                data = self.func(frame, data)
+            except Exception as e:
+                # Um erro em um frame não derruba o pipeline: o frame é descartado
+                print(f"❌ Erro no estágio '{self.name}': {e}")
+                self.on_drop(frame)
+                continue
+            self.busy_seconds += time.time() - start
+            self.processed += 1
+
+            # Bloqueia se o próximo estágio estiver atrasado (contrapressão até a captura)
+            self.output_queue.put((frame, data))
+
+
+class BatchStage(Stage):
+    def __init__(self, name, func, input_queue, output_queue, on_drop, batch_size=ENCODING_BATCH_SIZE,
+                 max_wait_ms=ENCODING_BATCH_MAX_WAIT_MS):
+        # Aqui func recebe a lista de pares (frame, dado) do lote e devolve a lista de novos dados, na mesma ordem
+        super().__init__(name, func, input_queue, output_queue, on_drop)
+
+        # Quantidade máxima de itens por lote e espera máxima (após o primeiro item) para completar o lote
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        # Quantidade de lotes processados (processed / batches = tamanho médio do lote)
+        self.batches = 0
+
+    def run(self):
+        """
+        Junta os itens que chegam dentro da janela de espera (até batch_size) e processa o lote de uma vez.
+        O primeiro item nunca espera mais que max_wait além do tempo de processamento, o que limita a latência extra.
+        """
+        stopping = False
+        while not stopping:
+            batch = [self.input_queue.get()]
+            if batch[0] is STOP:
+                break
+
+            deadline = time.time() + self.max_wait
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.input_queue.get(timeout=max(0.0, deadline - time.time()))
+                except queue.Empty:
+                    break
+                if item is STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            start = time.time()
+            try:
+                outputs = self.func(batch)
+            except Exception as e:
+                # Um erro no lote não derruba o pipeline: os frames do lote são descartados
+                print(f"❌ Erro no estágio '{self.name}': {e}")
+                for frame, _ in batch:
+                    self.on_drop(frame)
+                continue
+            self.busy_seconds += time.time() - start
+            self.processed += len(batch)
+            self.batches += 1
+
+            for (frame, _), data in zip(batch, outputs):
+                self.output_queue.put((frame, data))
+
+        self.output_queue.put(STOP)
+
+
+class RecognitionPipeline:
+    def __init__(self, camera, face_module, queue_size=PIPELINE_QUEUE_SIZE):
+        # Fonte de frames e módulo de reconhecimento
+        self.camera = camera
+        self.face_module = face_module
+
+        # Filas limitadas entre os estágios
+        self.detect_queue = queue.Queue(maxsize=queue_size)
+        self.identify_queue = queue.Queue(maxsize=queue_size)
+        self.results_queue = queue.Queue(maxsize=queue_size)
+
+        # Frames descartados na captura porque o estágio de detecção não acompanhou a câmera
+        self.dropped = 0
+        self.captured = 0
+
+        # Frames da câmera que nem chegaram a ser lidos pelo pipeline (saltos no número de sequência)
+        self.skipped = 0
+
+        # Controle de execução da thread de captura
+        self.running = True
+
+        # Estágios de processamento (cada um na sua thread). Cada estágio tem um único worker para manter
+        # a ordem dos frames, exigida pelo rastreador e pelo debounce.
+        # Com uma só câmera o encoding não espera por mais frames (max_wait_ms=0): o próximo frame só chega depois
+        # da detecção, então a espera só somaria latência; o lote junta apenas o que já estiver na fila.
+        self.stages = [
+            Stage("detecção", lambda frame, _: face_module.detect(frame),
+                  self.detect_queue, self.identify_queue, camera.release_frame),
+            BatchStage("encoding", lambda batch: face_module.identify_batch([detection for _, detection in batch]),
+                       self.identify_queue, self.results_queue, camera.release_frame, max_wait_ms=0),
+        ]
+
+        # Thread de captura: entrega ao pipeline sempre o frame mais recente da câmera
+        self.capture_thread = threading.Thread(target=self.capture, name="pipeline-captura", daemon=True)
+
+        for stage in self.stages:
+            stage.thread.start()
+        self.capture_thread.start()
+
+    def capture(self):
+        """
+        Estágio de captura: envia cada novo frame da câmera para a detecção.
+        Se a fila de detecção estiver cheia, o frame é descartado (é melhor processar um frame recente do que acumular atraso).
+        """
+        last_seq = 0
+        while self.running:
+            # Espera um frame mais novo que o último enviado (nunca reprocessa o mesmo frame)
+            latest = self.camera.get_latest(last_seq, timeout=0.5)
+            if latest is None:
+                continue
+            seq, _, frame = latest
+            if last_seq:
+                self.skipped += seq - last_seq - 1
+            last_seq = seq
+            self.captured += 1
+
+            try:
+                self.detect_queue.put_nowait((frame, None))
+            except queue.Full:
+                self.dropped += 1
+                self.camera.release_frame(frame)
+
+        self.detect_queue.put(STOP)
+
+    def results(self):
+        """
+        Gera os pares (frame, rostos) na ordem de captura, para o estágio de ações no main.py.
+        Quem consome deve devolver cada frame com camera.release_frame(frame) ao terminar.
+        """
+        while True:
+            item = self.results_queue.get()
+            if item is STOP:
+                return
+            yield item
+
+    def stats(self):
+        """
+        Retorna as estatísticas de cada estágio: profundidade da fila de entrada, itens processados e tempo médio (ms).
+        """
+        stats = {"captura": {"capturados": self.captured, "descartados": self.dropped, "pulados": self.skipped}}
+        stats.update(stage_stats(self.stages))
+        stats["ações"] = {"fila": self.results_queue.qsize()}
+        return stats
+
+    def stop(self):
+        """
+        Encerra a captura e propaga o sinal de parada por todos os estágios.
+        """
+        self.running = False
+
+        # Esvazia a fila de resultados até todas as threads terminarem, para que nenhuma fique bloqueada em put();
+        # os frames descartados voltam para o pool da câmera
+        while self.capture_thread.is_alive() or any(stage.thread.is_alive() for stage in self.stages):
+            try:
+                item = self.results_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is not STOP:
+                self.camera.release_frame(item[0])
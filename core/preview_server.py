@@ -0,0 +1,133 @@
+# preview_server.py
+
+"""
+O arquivo preview_server.py define a classe PreviewServer, um servidor HTTP mínimo que transmite a imagem das câmeras
+como MJPEG (multipart/x-mixed-replace), para acompanhar pelo navegador um dispositivo sem monitor (modo headless).
+Os frames só são desenhados e comprimidos em JPEG enquanto há algum cliente conectado, e no máximo PREVIEW_MAX_FPS
+vezes por segundo: sem ninguém assistindo, o custo para o reconhecimento é zero.
+"""
+
+import threading                                                     # O servidor roda em uma thread própria
+import time                                                          # Usado para limitar a taxa de compressão
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Servidor HTTP da biblioteca padrão
+from urllib.parse import unquote                                     # Nome da câmera no caminho da URL
+import cv2                                                           # Compressão dos frames em JPEG
+from config import PREVIEW_HOST, PREVIEW_PORT, PREVIEW_MAX_FPS, PREVIEW_JPEG_QUALITY  # Parâmetros do servidor
+
+# Separador entre as imagens do stream MJPEG
+BOUNDARY = "frame"
+
+
+class PreviewHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        """
+        Transmite o stream da câmera indicada no caminho (ex: /garagem); "/" transmite a primeira câmera.
+        """
+        preview = self.server.preview
+        camera = unquote(self.path.strip("/")) or None
+        if camera is not None and camera not in preview.cameras:
+            self.send_error(404, "Câmera não encontrada")
+            return
+        camera = camera if camera is not None else preview.cameras[0]
+
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        preview.connect(camera)
+        try:
+            seq = 0
+            while preview.running:
+                seq, jpeg = preview.wait_frame(camera, seq)
+                if jpeg is None:
+                    continue
+                self.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode())
+                self.wfile.write(jpeg)
+                self.wfile.write(b"\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Cliente fechou a conexão
+        finally:
+            preview.disconnect(camera)
+
+    def log_message(self, format, *args):
+        # Silencia o log padrão de cada requisição (o stream é uma única requisição longa)
+        pass
+
+
+class PreviewServer:
+    def __init__(self, cameras=(None,), host=PREVIEW_HOST, port=PREVIEW_PORT, max_fps=PREVIEW_MAX_FPS,
+                 quality=PREVIEW_JPEG_QUALITY):
+        # Nomes das câmeras disponíveis (None = câmera única)
+        self.cameras = list(cameras)
+
+        # Intervalo mínimo entre duas compressões da mesma câmera e qualidade do JPEG (0-100)
+        self.interval = 1.0 / max_fps if max_fps else 0.0
+        self.quality = quality
+
+        # Clientes conectados, último JPEG, sequência e instante da última compressão de cada câmera
+        self.clients = {camera: 0 for camera in self.cameras}
+        self.frames = {camera: (0, None) for camera in self.cameras}
+        self.last_encoded = {camera: 0.0 for camera in self.cameras}
+        self.condition = threading.Condition()
+
+        self.running = True
+        self.server = ThreadingHTTPServer((host, port), PreviewHandler)
+        self.server.daemon_threads = True
+        self.server.preview = self
+        self.thread = threading.Thread(target=self.server.serve_forever, name="preview", daemon=True)
+        self.thread.start()
+        print(f"📺 Pré-visualização MJPEG disponível em http://{host}:{port}/")
+
+    def connect(self, camera):
+        """
+        Registra um cliente conectado ao stream da câmera.
+        """
+        with self.condition:
+            self.clients[camera] += 1
+
+    def disconnect(self, camera):
+        """
+        Remove um cliente do stream da câmera (sem clientes, os frames deixam de ser comprimidos).
+        """
+        with self.condition:
+            self.clients[camera] -= 1
+
+    def wants_frame(self, camera=None):
+        """
+        Indica se o frame atual da câmera deve ser enviado (há clientes e o intervalo mínimo já passou).
+        Chamado no loop principal antes de desenhar, para não gastar nada sem clientes.
+        """
+        return self.clients.get(camera, 0) > 0 and time.time() - self.last_encoded[camera] >= self.interval
+
+    def publish(self, frame, camera=None):
+        """
+        Comprime o frame (já desenhado) em JPEG e o entrega aos clientes da câmera.
+        """
+        self.last_encoded[camera] = time.time()
+        ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return
+        with self.condition:
+            seq = self.frames[camera][0] + 1
+            self.frames[camera] = (seq, jpeg.tobytes())
+            self.condition.notify_all()
+
+    def wait_frame(self, camera, after_seq, timeout=1.0):
+        """
+        Espera um JPEG mais novo que after_seq. Retorna (sequência, JPEG), com JPEG None se o tempo esgotar.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.frames[camera][0] > after_seq or not self.running, timeout)
+            seq, jpeg = self.frames[camera]
+            return (seq, jpeg) if seq > after_seq else (after_seq, None)
+
+    def stop(self):
+        """
+        Encerra o servidor e os streams abertos.
+        """
+        self.running = False
+        with self.condition:
+            self.condition.notify_all()
+        self.server.shutdown()
+        self.server.server_close()
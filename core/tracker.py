@@ -0,0 +1,188 @@
+# tracker.py
+
+"""
+O arquivo tracker.py define a classe FaceTracker, um rastreador leve de rostos baseado em associação por IoU
+(interseção sobre união das caixas) e previsão por velocidade constante.
+Com ele, a detecção HOG e o encoder do dlib rodam apenas a cada DETECTION_INTERVAL_FRAMES frames (ou quando o
+rastreador perde a confiança); nos frames intermediários as caixas e identidades são propagadas pelo rastreador.
+"""
+
+from config import DETECTION_INTERVAL_FRAMES, TRACKER_IOU_THRESHOLD, TRACKER_MAX_MISSES  # Parâmetros do rastreamento
+
+
+def iou(a, b):
+    """
+    Calcula a interseção sobre união (IoU) entre duas caixas no formato (top, right, bottom, left).
+    """
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+    intersection = max(0, right - left) * max(0, bottom - top)
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    union = area_a + area_b - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+class Track:
+    def __init__(self, track_id, box):
+        # Identificador estável do rosto enquanto ele permanecer rastreado
+        self.id = track_id
+
+        # Caixa atual (top, right, bottom, left), em ponto flutuante para acumular a previsão
+        self.box = tuple(float(v) for v in box)
+
+        # Deslocamento médio da caixa por frame (usado para prever a posição entre detecções)
+        self.velocity = (0.0, 0.0, 0.0, 0.0)
+
+        # Identidade associada ao rosto (nome e distância para a galeria), definida após o encoding
+        self.name = None
+        self.distance = None
+
+        # Escala da imagem em que a caixa foi detectada pela última vez (ver latency_controller.py)
+        self.scale = None
+
+        # Frames desde a última detecção que confirmou esta caixa
+        self.frames_since_detection = 0
+
+        # Detecções consecutivas em que o rastro não foi encontrado
+        self.misses = 0
+
+    @property
+    def location(self):
+        """
+        Caixa atual arredondada para inteiros, no mesmo formato das localizações do face_recognition.
+        """
+        return tuple(int(round(v)) for v in self.box)
+
+    def predict(self):
+        """
+        Avança a caixa um frame usando a velocidade estimada.
+        """
+        self.box = tuple(v + dv for v, dv in zip(self.box, self.velocity))
+        self.frames_since_detection += 1
+
+    def correct(self, box):
+        """
+        Atualiza a caixa com uma nova detecção e suaviza a estimativa de velocidade.
+        """
+        box = tuple(float(v) for v in box)
+        frames = max(1, self.frames_since_detection)
+
+        # A previsão já moveu a caixa; a velocidade é corrigida a partir da posição da detecção anterior
+        previous = tuple(v - dv * self.frames_since_detection for v, dv in zip(self.box, self.velocity))
+        measured = tuple((new - old) / frames for new, old in zip(box, previous))
+        self.velocity = tuple(0.5 * old + 0.5 * new for old, new in zip(self.velocity, measured))
+
+        self.box = box
+        self.frames_since_detection = 0
+        self.misses = 0
+
+
+class FaceTracker:
+    def __init__(self, interval=DETECTION_INTERVAL_FRAMES, iou_threshold=TRACKER_IOU_THRESHOLD, max_misses=TRACKER_MAX_MISSES):
+        # Intervalo máximo (em frames) entre duas detecções completas
+        self.interval = interval
+
+        # IoU mínimo para associar uma detecção a um rastro existente
+        self.iou_threshold = iou_threshold
+
+        # Quantas detecções seguidas um rastro pode ficar sem correspondência antes de ser descartado
+        self.max_misses = max_misses
+
+        # Rastros ativos, do mais antigo para o mais novo
+        self.tracks = []
+
+        # Próximo identificador de rastro
+        self.next_id = 1
+
+        # Frames desde a última detecção completa
+        self.frames_since_detection = 0
+
+    def needs_detection(self, frame_size):
+        """
+        Indica se o frame atual precisa de detecção completa.
+
+        Parâmetros:
+        - frame_size: tupla (altura, largura) do frame em que as caixas são expressas
+
+        A detecção é necessária quando não há rastros visíveis (ninguém para propagar), quando o intervalo foi atingido,
+        quando algum rastro ainda não tem identidade ou quando uma caixa prevista saiu do frame (perda de confiança).
+        """
+        if self.frames_since_detection + 1 >= self.interval:
+            return True
+
+        # Nenhum rosto visível: detecta em todo frame para não atrasar a chegada de alguém
+        if not any(track.misses == 0 for track in self.tracks):
+            return True
+
+        height, width = frame_size
+        for track in self.tracks:
+            if track.misses:
+                continue
+            if track.name is None:
+                return True
+            top, right, bottom, left = track.box
+            if top < 0 or left < 0 or bottom > height or right > width:
+                return True
+        return False
+
+    def predict(self):
+        """
+        Propaga todos os rastros para o frame atual sem detecção e retorna os rastros visíveis.
+        """
+        self.frames_since_detection += 1
+        for track in self.tracks:
+            track.predict()
+        return [track for track in self.tracks if track.misses == 0]
+
+    def hold(self):
+        """
+        Mantém os rastros na posição atual (cena estática, ver motion.py) e retorna os rastros visíveis.
+        """
+        self.frames_since_detection += 1
+        return [track for track in self.tracks if track.misses == 0]
+
+    def update(self, locations):
+        """
+        Associa as detecções do frame atual aos rastros existentes (maior IoU primeiro).
+        Detecções sem correspondência criam novos rastros; rastros sem correspondência acumulam falhas e,
+        depois de TRACKER_MAX_MISSES detecções, são descartados.
+
+        Retorna a lista de rastros na mesma ordem de locations.
+        """
+        self.frames_since_detection = 0
+
+        # Todos os pares (rastro, detecção) com IoU suficiente, do maior para o menor
+        pairs = []
+        for t, track in enumerate(self.tracks):
+            for d, location in enumerate(locations):
+                overlap = iou(track.box, location)
+                if overlap >= self.iou_threshold:
+                    pairs.append((overlap, t, d))
+        pairs.sort(reverse=True)
+
+        # Associação gulosa: cada rastro e cada detecção são usados no máximo uma vez
+        assigned = [None] * len(locations)
+        used = set()
+        for _, t, d in pairs:
+            if t in used or assigned[d] is not None:
+                continue
+            self.tracks[t].correct(locations[d])
+            assigned[d] = self.tracks[t]
+            used.add(t)
+
+        # Rastros não encontrados nesta detecção
+        for t, track in enumerate(self.tracks):
+            if t not in used:
+                track.misses += 1
+        self.tracks = [track for track in self.tracks if track.misses <= self.max_misses]
+
+        # Detecções novas iniciam novos rastros
+        for d, location in enumerate(locations):
+            if assigned[d] is None:
+                track = Track(self.next_id, location)
+                self.next_id += 1
+                self.tracks.append(track)
+                assigned[d] = track
+
+        return assigned
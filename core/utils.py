@@ -2,7 +2,7 @@
 
 import cv2  # Biblioteca OpenCV para manipulação e desenho em imagens
 
-def draw_face_box(frame, name, location, scale=1/0.25):
+def draw_face_box(frame, name, location, scale=1):
     """
     Desenha um retângulo ao redor do rosto detectado e escreve o nome associado.
     
@@ -10,7 +10,7 @@ def draw_face_box(frame, name, location, scale=1/0.25):
     - frame: imagem (frame) onde o desenho será feito
     - name: nome da pessoa reconhecida (string)
     - location: tupla com a posição do rosto na imagem (top, right, bottom, left)
-    - scale: fator para ajustar as coordenadas da caixa (padrão é 1/0.25 porque o reconhecimento usa frame redimensionado)
+    - scale: fator para ajustar as coordenadas da caixa (padrão é 1 porque o reconhecimento já retorna coordenadas do frame original)
     
     Retorna:
     - frame com o retângulo e nome desenhados
@@ -41,3 +41,20 @@ def draw_face_box(frame, name, location, scale=1/0.25):
 
     # Retorna o frame modificado
     return frame
+
+
+def draw_faces(frame, faces, scale=1):
+    """
+    Desenha a caixa e o nome de todos os rostos reconhecidos em um frame.
+
+    Parâmetros:
+    - frame: imagem (frame) onde o desenho será feito
+    - faces: lista de resultados do reconhecimento (objetos com os atributos name e location, como FaceResult)
+    - scale: fator para ajustar as coordenadas das caixas (ver draw_face_box)
+
+    Retorna:
+    - frame com os retângulos e nomes desenhados
+    """
+    for face in faces:
+        frame = draw_face_box(frame, face.name, face.location, scale)
+    return frame
@@ -0,0 +1,304 @@
+# worker_pool.py
+
+"""
+O arquivo worker_pool.py define a classe RecognitionWorkerPool, um modo de execução em que a detecção HOG e o encoder
+do dlib rodam em vários processos (um por núcleo), sem a limitação do GIL.
+Cada frame é copiado para um bloco de memória compartilhada (multiprocessing.shared_memory) em vez de ser serializado,
+e cada processo mantém a sua própria cópia da galeria. Os resultados voltam fora de ordem e são reordenados pelo
+número de sequência antes de chegar ao main.py, de modo que o rastreador e o debounce recebem os frames em ordem.
+A interface (results(), stats() e stop()) é a mesma de RecognitionPipeline.
+"""
+
+import multiprocessing                       # Processos de reconhecimento e filas entre eles
+import os                                    # Usado para descobrir a quantidade de núcleos disponíveis
+import queue                                 # Exceções das filas (vazia) e fila de blocos livres
+import threading                             # Threads de envio e de recebimento no processo principal
+import time                                  # Usado para medir a latência de cada frame
+from multiprocessing import shared_memory    # Blocos de memória compartilhada onde os frames são copiados
+import numpy as np                           # Usado para ler e escrever os frames nos blocos compartilhados
+from config import RECOGNITION_WORKERS, RECOGNITION_WORKER_SLOTS, MOTION_ENABLED, MOTION_MAX_STATIC_FRAMES  # Parâmetros
+from motion import MotionDetector            # Pré-filtro de movimento (roda no processo principal, em ordem)
+from tracker import FaceTracker              # Ids estáveis dos rostos, atribuídos em ordem após a reordenação
+
+# Marcador que sinaliza o fim do fluxo
+STOP = None
+
+
+def gallery_arrays(gallery):
+    """
+    Extrai da galeria os dados enviados aos processos: matriz de encodings e nome de cada amostra.
+    """
+    return gallery.matrix, [gallery.names[i] for i in gallery.name_ids]
+
+
+def worker_main(encodings, names, tasks, control, results):
+    """
+    Laço de cada processo de reconhecimento: lê o frame do bloco compartilhado indicado na tarefa, detecta, codifica e
+    compara os rostos com a sua cópia da galeria, e devolve os resultados (sem rastreamento: os frames chegam fora de ordem).
+    """
+    # Importados apenas dentro do processo, que monta a sua própria galeria e índice ANN
+    from face_recognition_module import FaceRecognitionModule
+    from gallery import FaceGallery
+    from ann_index import create_index
+
+    def build(encodings, names):
+        gallery = FaceGallery(encodings, names)
+        gallery.index = create_index(gallery.indexed_matrix, gallery.indexed_ids)
+        return gallery
+
+    # O nível de detecção e a tolerância vêm em cada tarefa, definidos pelo processo principal
+    module = FaceRecognitionModule(build(encodings, names), tracking=False, motion=False)
+    module.controller.enabled = False
+    blocks = {}
+
+    while True:
+        task = tasks.get()
+        if task is STOP:
+            break
+
+        # Galeria recarregada no processo principal: troca a cópia local antes do próximo frame
+        try:
+            while True:
+                module.swap_gallery(build(*control.get_nowait()))
+        except queue.Empty:
+            pass
+
+        order, block_name, shape, setting, tolerance = task
+        module.tolerance = tolerance
+        started = time.time()
+        try:
+            if block_name not in blocks:
+                blocks[block_name] = shared_memory.SharedMemory(name=block_name)
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=blocks[block_name].buf)
+            faces = module.identify(module.detect(frame, setting))
+            results.put((order, block_name, faces, time.time() - started, None))
+        except Exception as e:
+            results.put((order, block_name, None, time.time() - started, str(e)))
+
+    for block in blocks.values():
+        block.close()
+
+
+class RecognitionWorkerPool:
+    def __init__(self, camera, face_module, workers=RECOGNITION_WORKERS, slots=RECOGNITION_WORKER_SLOTS):
+        # Fonte de frames e módulo de reconhecimento do processo principal (galeria, controle de latência e contadores)
+        self.camera = camera
+        self.face_module = face_module
+
+        # Quantidade de processos (None = todos os núcleos) e de blocos compartilhados por processo
+        self.workers = workers or os.cpu_count() or 1
+        self.slots = max(1, slots) * self.workers
+
+        # Blocos de memória compartilhada (criados ao receber o primeiro frame) e fila dos blocos livres
+        self.blocks = {}
+        self.free_blocks = queue.Queue()
+
+        # Filas entre processos: tarefas (compartilhada), galeria (uma por processo) e resultados
+        context = multiprocessing.get_context("spawn")
+        self.tasks = context.Queue()
+        self.controls = [context.Queue() for _ in range(self.workers)]
+        self.results_queue = context.Queue()
+
+        # Cada processo recebe uma cópia da galeria atual
+        self.gallery = face_module.gallery
+        encodings, names = gallery_arrays(self.gallery)
+        self.processes = [
+            context.Process(target=worker_main, args=(encodings, names, self.tasks, control, self.results_queue),
+                            name=f"reconhecimento-{i}", daemon=True)
+            for i, control in enumerate(self.controls)
+        ]
+        for process in self.processes:
+            process.start()
+
+        # Frames aguardando resultado, na ordem de envio: número de ordem -> [frame, rostos ou None, repetir o anterior]
+        self.pending = {}
+        self.pending_lock = threading.Condition()
+        self.next_order = 0
+
+        # Pré-filtro de movimento e rastreador do processo principal (os processos não guardam estado entre frames)
+        self.motion = MotionDetector() if MOTION_ENABLED else None
+        self.tracker = FaceTracker()
+        self.static_frames = 0
+
+        # Contadores
+        self.captured = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.dispatched = 0
+        self.errors = 0
+
+        # Threads de envio (captura) e de recebimento dos resultados
+        self.running = True
+        self.capture_thread = threading.Thread(target=self.capture, name="workers-captura", daemon=True)
+        self.collect_thread = threading.Thread(target=self.collect, name="workers-resultados", daemon=True)
+        self.capture_thread.start()
+        self.collect_thread.start()
+
+    def capture(self):
+        """
+        Envia cada novo frame da câmera para um processo livre. Sem bloco compartilhado livre, o frame é descartado
+        (é melhor processar um frame recente do que acumular atraso). Frames estáticos não são enviados.
+        """
+        last_seq = 0
+        order = 0
+        while self.running:
+            latest = self.camera.get_latest(last_seq, timeout=0.5)
+            if latest is None:
+                continue
+            seq, _, frame = latest
+            if last_seq:
+                self.skipped += seq - last_seq - 1
+            last_seq = seq
+            self.captured += 1
+
+            # O main.py não está acompanhando: descarta o frame em vez de acumular frames retidos
+            with self.pending_lock:
+                backlog = len(self.pending)
+            if backlog >= 2 * self.slots:
+                self.dropped += 1
+                self.camera.release_frame(frame)
+                continue
+
+            # Cena estática: repete os rostos do frame anterior (exceto a detecção periódica de segurança)
+            static = self.motion and self.motion.update(frame) is None
+            if static and self.static_frames < MOTION_MAX_STATIC_FRAMES:
+                self.static_frames += 1
+                self.face_module.skipped_detections += 1
+                self._add_pending(order, [frame, None, True])
+                order += 1
+                continue
+
+            block_name = self._free_block(frame)
+            if block_name is None:
+                self.dropped += 1
+                self.camera.release_frame(frame)
+                continue
+
+            # Galeria recarregada (ver gallery_watcher.py): envia a nova galeria a todos os processos
+            if self.face_module.gallery is not self.gallery:
+                self.gallery = self.face_module.gallery
+                for control in self.controls:
+                    control.put(gallery_arrays(self.gallery))
+
+            # Uma única cópia do frame para a memória compartilhada; o frame original fica para o main.py
+            block = self.blocks[block_name]
+            np.copyto(np.ndarray(frame.shape, dtype=np.uint8, buffer=block.buf), frame)
+            self._add_pending(order, [frame, None, False])
+            self.tasks.put((order, block_name, frame.shape, self.face_module.controller.setting, self.face_module.tolerance))
+            self.static_frames = 0
+            self.dispatched += 1
+            self.face_module.detections += 1
+            order += 1
+
+    def _free_block(self, frame):
+        """
+        Retorna o nome de um bloco compartilhado livre do tamanho do frame (criando os blocos no primeiro frame), ou None.
+        """
+        if not self.blocks:
+            for _ in range(self.slots):
+                block = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+                self.blocks[block.name] = block
+                self.free_blocks.put(block.name)
+        if frame.nbytes > next(iter(self.blocks.values())).size:
+            raise ValueError("❌ O tamanho dos frames da câmera mudou durante a execução.")
+        try:
+            return self.free_blocks.get_nowait()
+        except queue.Empty:
+            return None
+
+    def _add_pending(self, order, entry):
+        """
+        Registra um frame aguardando resultado e acorda quem espera pela próxima posição da ordem.
+        """
+        with self.pending_lock:
+            self.pending[order] = entry
+            self.pending_lock.notify_all()
+
+    def collect(self):
+        """
+        Recebe os resultados dos processos (em qualquer ordem), libera os blocos compartilhados e informa a latência
+        de cada frame ao controle de latência do processo principal.
+        """
+        while True:
+            item = self.results_queue.get()
+            if item is STOP:
+                return
+            order, block_name, faces, elapsed, error = item
+            self.free_blocks.put(block_name)
+            if error:
+                self.errors += 1
+                print(f"❌ Erro no processo de reconhecimento: {error}")
+            else:
+                self.face_module.controller.observe(elapsed)
+            with self.pending_lock:
+                # Frame com erro: repete os rostos do frame anterior em vez de informar uma cena vazia
+                # (uma lista vazia seria tratada pelo debounce como a saída da pessoa)
+                if error:
+                    self.pending[order][2] = True
+                else:
+                    self.pending[order][1] = faces
+                self.pending_lock.notify_all()
+
+    def results(self):
+        """
+        Gera os pares (frame, rostos) na ordem de captura, no mesmo formato de RecognitionPipeline.results().
+        Os ids dos rastros são atribuídos aqui, já em ordem. Quem consome deve devolver cada frame com
+        camera.release_frame(frame) ao terminar.
+        """
+        previous = []
+        while True:
+            with self.pending_lock:
+                # Espera o próximo frame da ordem ficar pronto
+                while self.running:
+                    entry = self.pending.get(self.next_order)
+                    if entry and (entry[2] or entry[1] is not None):
+                        break
+                    self.pending_lock.wait(0.5)
+                else:
+                    return
+                del self.pending[self.next_order]
+                self.next_order += 1
+
+            frame, faces, repeat = entry
+            if repeat:
+                # Frame estático (ou com erro no processo): mantém os rostos do frame anterior
+                faces = previous
+            else:
+                tracks = self.tracker.update([face.location for face in faces])
+                faces = [face._replace(track_id=track.id) for face, track in zip(faces, tracks)]
+            previous = faces
+            yield frame, faces
+
+    def stats(self):
+        """
+        Retorna as estatísticas do modo com processos: frames capturados, descartados, enviados, em processamento e erros.
+        """
+        with self.pending_lock:
+            waiting = len(self.pending)
+        return {"captura": {"capturados": self.captured, "descartados": self.dropped, "pulados": self.skipped},
+                "processos": {"quantidade": self.workers, "enviados": self.dispatched, "aguardando": waiting,
+                              "erros": self.errors}}
+
+    def stop(self):
+        """
+        Encerra a captura e os processos, devolve os frames pendentes e libera a memória compartilhada.
+        """
+        self.running = False
+        self.capture_thread.join()
+        for _ in self.processes:
+            self.tasks.put(STOP)
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.results_queue.put(STOP)
+        self.collect_thread.join()
+
+        with self.pending_lock:
+            for frame, _, _ in self.pending.values():
+                self.camera.release_frame(frame)
+            self.pending.clear()
+
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()